@@ -0,0 +1,573 @@
+"""Замеры производительности пазла.
+
+Запуск без окна на экране:
+    python benchmark.py drag --sizes 6 12 24 48
+    python benchmark.py cluster --grid 30 --cluster 500
+    python benchmark.py --image photo.jpg memory
+    python benchmark.py pieces --sizes 6 50
+    python benchmark.py startup --sizes 6 30 100
+    python benchmark.py launch --runs 5
+    python benchmark.py render --sizes 6 12 24
+    python benchmark.py --image photo.jpg hints --sizes 10 25 50
+    python benchmark.py replay --sizes 6 12 24 --output results.json
+    python benchmark.py replay --sizes 12 --moves-per-frame 16
+    python benchmark.py replay --sizes 12 --record session.json
+    python benchmark.py replay --session session.json
+"""
+import argparse
+import atexit
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_IMAGE = os.path.join(ROOT, 'landscape', '1.jpg')
+
+CALLER_DIR = os.getcwd()
+
+sys.path.insert(0, ROOT)
+# Работаем во временной папке, чтобы не трогать сохранения игрока;
+# при выходе она удаляется вместе с кэшем досок и сохранениями
+WORK_DIR = tempfile.mkdtemp(prefix='puzzle-bench-')
+os.chdir(WORK_DIR)
+
+
+@atexit.register
+def remove_work_dir():
+    # Текущую папку в Windows удалить нельзя
+    os.chdir(CALLER_DIR)
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+from PyQt6.QtCore import QEvent, QPointF, QRectF, QSize, Qt
+from PyQt6.QtGui import QMouseEvent, QPixmap
+from PyQt6.QtWidgets import QApplication
+
+import puzzle
+from puzzle_model import SNAP_DISTANCE
+
+
+def make_window(grid_size, image_path=DEFAULT_IMAGE, seed=None):
+    """Создает игровое окно без показа на экране и ждет, пока построится доска"""
+    window = puzzle.GameWindow(image_path, grid_size, seed)
+    while not window.pieces_ready:
+        QApplication.processEvents()
+    return window
+
+
+def full_scan(model, piece_id):
+    """Старый способ поиска соседей: обход всех фрагментов"""
+    x, y = model.correct[piece_id]
+    for other_id in range(model.count):
+        if other_id != piece_id and not model.same_group(piece_id, other_id) and \
+                model.are_neighbors(piece_id, other_id):
+            other_x, other_y = model.correct[other_id]
+            if model.offset_error(piece_id, other_id, other_x - x, other_y - y) < SNAP_DISTANCE:
+                return other_id
+    return None
+
+
+def bench_drag(args):
+    """Стоимость одного шага перетаскивания в зависимости от размера сетки"""
+    rng = random.Random(args.seed)
+    print(f"{'grid':>6} {'pieces':>7} {'table, us':>10} {'full scan, us':>14}")
+    for grid_size in args.sizes:
+        window = make_window(grid_size)
+        rect = window.scene.sceneRect()
+        moves = [
+            (rng.randrange(len(window.pieces)),
+             QPointF(rng.uniform(0, rect.width()), rng.uniform(0, rect.height())))
+            for _ in range(args.moves)
+        ]
+
+        start = time.perf_counter()
+        for piece_id, pos in moves:
+            piece = window.pieces[piece_id]
+            if piece.is_placed:
+                continue
+            piece.drag_to(pos)
+        indexed = (time.perf_counter() - start) / args.moves
+
+        start = time.perf_counter()
+        for piece_id, pos in moves:
+            full_scan(window.model, piece_id)
+        scanned = (time.perf_counter() - start) / args.moves
+
+        print(f"{grid_size:>6} {len(window.pieces):>7} {indexed * 1e6:>10.1f} {scanned * 1e6:>14.1f}")
+        window.close()
+
+
+def bench_cluster(args):
+    """Перетаскивание большой группы: один setPos родителя против цикла по фрагментам"""
+    window = make_window(args.grid)
+    cluster_size = min(args.cluster, len(window.pieces))
+    leader = window.pieces[0]
+    for piece_id in range(1, cluster_size):
+        window.model.merge(0, piece_id)
+
+    steps = [QPointF(100 + (i % 40), 100 + (i % 25)) for i in range(args.moves)]
+
+    start = time.perf_counter()
+    for pos in steps:
+        leader.drag_to(pos)
+    grouped = (time.perf_counter() - start) / args.moves
+
+    # Старый способ: отдельный setPos для каждого фрагмента группы
+    loose = make_window(args.grid).pieces[:cluster_size]
+    start = time.perf_counter()
+    for pos in steps:
+        delta = pos - loose[0].pos()
+        for piece in loose:
+            piece.setPos(piece.pos() + delta)
+    looped = (time.perf_counter() - start) / args.moves
+
+    print(f"cluster of {cluster_size} pieces: group item {grouped * 1e6:.1f} us/move, "
+          f"per-piece loop {looped * 1e6:.1f} us/move")
+
+
+def rss_kb():
+    """Текущий RSS процесса в килобайтах"""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() // 1024
+
+
+def bench_decode(args):
+    """Дочерний процесс для bench_memory: открывает изображение одним из способов"""
+    before = rss_kb()
+    if args.mode == 'full':
+        # Прежний способ: полный декод, затем два масштабирования
+        original = QPixmap(args.image)
+        scaled = original.scaled(700, 700, Qt.AspectRatioMode.KeepAspectRatio,
+                                 Qt.TransformationMode.SmoothTransformation)
+        preview = original.scaled(250, 250, Qt.AspectRatioMode.KeepAspectRatio,
+                                  Qt.TransformationMode.SmoothTransformation)
+    else:
+        scaled = QPixmap.fromImage(puzzle.load_scaled_image(args.image, QSize(700, 700)))
+        preview = scaled.scaled(250, 250, Qt.AspectRatioMode.KeepAspectRatio,
+                                Qt.TransformationMode.SmoothTransformation)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(before, peak, rss_kb())
+
+
+def bench_memory(args):
+    """Пиковый RSS при открытии изображения: полный декод против уменьшенного"""
+    print(f"image: {args.image}")
+    for mode in ('full', 'scaled'):
+        result = subprocess.run(
+            [sys.executable, os.path.join(ROOT, 'benchmark.py'), '--image', args.image, '_decode', mode],
+            capture_output=True, text=True, check=True
+        )
+        before, peak, after = map(int, result.stdout.split()[-3:])
+        print(f"{mode:>7}: peak +{(peak - before) / 1024:.1f} MiB, held +{(after - before) / 1024:.1f} MiB")
+
+
+def bench_build_pieces(args):
+    """Дочерний процесс для bench_pieces: создает фрагменты одним из способов"""
+    window = make_window(args.grid)
+    window.clear_pieces()
+    before = rss_kb()
+    start = time.perf_counter()
+    window.create_new_puzzle(chunked=False)
+    if args.mode == 'copy':
+        # Прежний способ: отдельная копия пикселей на каждый фрагмент
+        copies = [window.scaled_image.copy(piece.source_rect.toRect()) for piece in window.pieces]
+    elapsed = time.perf_counter() - start
+    print(elapsed, rss_kb() - before)
+
+
+def bench_pieces(args):
+    """Время создания и память фрагментов: копии пикселей против общего изображения"""
+    print(f"{'grid':>6} {'mode':>7} {'build, ms':>10} {'RSS, MiB':>9}")
+    for grid_size in args.sizes:
+        for mode in ('copy', 'shared'):
+            result = subprocess.run(
+                [sys.executable, os.path.join(ROOT, 'benchmark.py'), '_pieces', mode, str(grid_size)],
+                capture_output=True, text=True, check=True
+            )
+            elapsed, rss = result.stdout.split()[-2:]
+            print(f"{grid_size:>6} {mode:>7} {float(elapsed) * 1e3:>10.1f} {int(rss) / 1024:>9.1f}")
+
+
+def bench_startup(args):
+    """Длительность этапов запуска игрового окна: первое открытие и повторное (из кэша доски)"""
+    stages = ('decode_image', 'parse_save', 'first_paint', 'build_pieces')
+    print(f"{'grid':>6} {'cache':>6} " + ' '.join(f"{stage + ', ms':>16}" for stage in stages))
+    for grid_size in args.sizes:
+        for cache in ('miss', 'hit'):
+            if cache == 'miss':
+                shutil.rmtree(puzzle.board_cache.folder, ignore_errors=True)
+            window = puzzle.GameWindow(args.image, grid_size)
+            window.show()
+            while not window.pieces_ready or 'first_paint' not in window.startup_timings:
+                QApplication.processEvents()
+            print(f"{grid_size:>6} {cache:>6} " +
+                  ' '.join(f"{window.startup_timings[stage]:>16.1f}" for stage in stages))
+            window.close()
+
+
+# Дочерний процесс для bench_launch: от импорта модуля до первой отрисовки главного окна
+LAUNCH_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import puzzle
+imported = time.perf_counter()
+from PyQt6.QtCore import QEvent, QObject
+from PyQt6.QtWidgets import QApplication
+
+class FirstPaint(QObject):
+    painted = None
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint and self.painted is None:
+            self.painted = time.perf_counter()
+        return False
+
+app = QApplication(sys.argv)
+window = puzzle.MainWindow()
+first_paint = FirstPaint()
+window.installEventFilter(first_paint)
+window.show()
+while first_paint.painted is None:
+    app.processEvents()
+print((imported - start) * 1e3, (first_paint.painted - start) * 1e3, int('PyQt6.QtMultimedia' in sys.modules))
+"""
+
+
+def bench_launch(args):
+    """Время от импорта модуля до первой отрисовки главного окна (в новом процессе)"""
+    print(f"{'run':>4} {'import, ms':>11} {'first window, ms':>17} {'multimedia loaded':>18}")
+    totals = []
+    for run in range(args.runs):
+        result = subprocess.run([sys.executable, '-c', LAUNCH_SCRIPT, ROOT],
+                                capture_output=True, text=True, check=True)
+        imported, first_window, multimedia = result.stdout.split()[-3:]
+        totals.append(float(first_window))
+        print(f"{run + 1:>4} {float(imported):>11.1f} {float(first_window):>17.1f} {bool(int(multimedia))!s:>18}")
+    print(f"median first window: {percentile(totals, 0.5):.1f} ms")
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def bench_render(args):
+    """Время кадра при перетаскивании фрагмента для разных политик отрисовки"""
+    print(f"{'grid':>6} {'policy':>9} {'mean, ms':>9} {'p95, ms':>8}")
+    for grid_size in args.sizes:
+        for policy in args.policies:
+            window = make_window(grid_size)
+            window.set_render_policy(policy)
+            window.show()
+            for _ in range(10):
+                QApplication.processEvents()
+
+            piece = next(piece for piece in window.pieces if not piece.is_placed)
+            rect = window.scene.sceneRect()
+            window.begin_drag()
+            frames = []
+            for i in range(args.frames):
+                start = time.perf_counter()
+                piece.drag_to(QPointF(rect.width() * (i % 50) / 50, rect.height() * (i % 30) / 30))
+                QApplication.processEvents()
+                frames.append(time.perf_counter() - start)
+            window.end_drag()
+
+            mean = sum(frames) / len(frames)
+            print(f"{grid_size:>6} {policy:>9} {mean * 1e3:>9.2f} {percentile(frames, 0.95) * 1e3:>8.2f}")
+            window.close()
+
+
+def bench_hints(args):
+    """Матрица несходства краев и подсказки на ее основе"""
+    hints = puzzle.load_hints()
+    if hints is None:
+        raise SystemExit('hints need NumPy')
+    print(f"{'grid':>6} {'pixels, ms':>11} {'matrix, ms':>11} {'cached, ms':>11} {'best match':>11} "
+          f"{'suggest, ms':>12} {'assemble, ms':>13} {'attached':>9}")
+    for grid_size in args.sizes:
+        window = make_window(grid_size, args.image, args.seed)
+        model = window.model
+
+        start = time.perf_counter()
+        window.scaled_pixels()
+        converted = time.perf_counter() - start
+        hints._edge_cache.clear()
+        start = time.perf_counter()
+        matrix = window.edge_matrix()
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        window.edge_matrix()
+        cached = time.perf_counter() - start
+
+        # Доля фрагментов, для которых лучший сосед справа - настоящий
+        inner = [piece_id for piece_id in range(model.count) if piece_id % grid_size < grid_size - 1]
+        best = matrix.right[inner].argmin(axis=1)
+        accuracy = sum(int(other_id) == piece_id + 1 for piece_id, other_id in zip(inner, best)) / len(inner)
+
+        start = time.perf_counter()
+        hints.suggest_move(model, matrix)
+        suggested = time.perf_counter() - start
+        start = time.perf_counter()
+        attached = hints.assemble_group(model, matrix, model.count // 2)
+        assembled = time.perf_counter() - start
+        print(f"{grid_size:>6} {converted * 1e3:>11.1f} {built * 1e3:>11.1f} {cached * 1e3:>11.3f} "
+              f"{accuracy:>11.0%} {suggested * 1e3:>12.1f} {assembled * 1e3:>13.1f} {len(attached):>9}")
+        window.close()
+
+
+def make_sessions(model, rng, count, steps):
+    """Синтетические сеансы перетаскивания по начальной раскладке.
+
+    Каждый сеанс - нажатие на фрагмент, steps перемещений указателя и отпускание.
+    Примерно половина сеансов ведет фрагмент к правильному месту или к соседу,
+    остальные - в случайную точку поля.
+    """
+    left, top, right, bottom = model.bounds
+    sessions = []
+    for _ in range(count):
+        piece_id = rng.randrange(model.count)
+        grab = (rng.uniform(0, model.piece_width), rng.uniform(0, model.piece_height))
+        x, y = model.position(piece_id)
+        target = rng.random()
+        if target < 0.25:
+            end_x, end_y = model.correct[piece_id]
+        elif target < 0.5:
+            end_x, end_y = model.target_next_to(piece_id, rng.choice(sorted(model.neighbor_ids(piece_id))))
+        else:
+            end_x = rng.uniform(left, right - model.piece_width)
+            end_y = rng.uniform(top, bottom - model.piece_height)
+        end_x += rng.uniform(-10, 10)
+        end_y += rng.uniform(-10, 10)
+        moves = [
+            (x + (end_x - x) * step / steps + grab[0], y + (end_y - y) * step / steps + grab[1])
+            for step in range(1, steps + 1)
+        ]
+        sessions.append({'piece': piece_id, 'grab': grab, 'moves': moves})
+    return sessions
+
+
+def send_mouse(view, event_type, scene_pos):
+    """Отправляет в область просмотра событие мыши в точке сцены scene_pos"""
+    pos = view.viewportTransform().map(scene_pos)
+    buttons = Qt.MouseButton.NoButton if event_type == QEvent.Type.MouseButtonRelease else Qt.MouseButton.LeftButton
+    button = Qt.MouseButton.NoButton if event_type == QEvent.Type.MouseMove else Qt.MouseButton.LeftButton
+    event = QMouseEvent(event_type, pos, view.viewport().mapToGlobal(pos), button, buttons,
+                        Qt.KeyboardModifier.NoModifier)
+    QApplication.sendEvent(view.viewport(), event)
+
+
+def replay(window, sessions, moves_per_frame=1):
+    """Проигрывает сеансы через область просмотра окна.
+
+    На каждый кадр приходится moves_per_frame перемещений (мышь с частым
+    опросом): после них применяется последняя отложенная позиция (как по
+    таймеру DragCoalescer) и перерисовывается окно, а остальные перемещения
+    кадра поглощаются. Притягивание проверяется раз в SNAP_CHECK_INTERVAL
+    по часам кадров. Время кадра замеряется отдельно ('flush').
+
+    Возвращает длительности по типам, число притягиваний и число
+    пропущенных сеансов, чей фрагмент оказался вне области просмотра.
+    """
+    snaps = [0]
+    on_snap = window.on_snap
+
+    def count_snap():
+        snaps[0] += 1
+        on_snap()
+
+    window.on_snap = count_snap
+    view = window.view
+    visible = QRectF(view.viewport().rect())
+    latency = {'press': [], 'move': [], 'flush': [], 'release': []}
+    skipped = 0
+    frame = 0
+    frame_moves = 0
+    for session in sessions:
+        piece = window.pieces[session['piece']]
+        press_pos = piece.scenePos() + QPointF(*session['grab'])
+        if not visible.contains(view.viewportTransform().map(press_pos)):
+            skipped += 1
+            continue
+        events = [('press', QEvent.Type.MouseButtonPress, press_pos)]
+        events += [('move', QEvent.Type.MouseMove, QPointF(x, y)) for x, y in session['moves']]
+        events.append(('release', QEvent.Type.MouseButtonRelease, events[-1][2]))
+        for kind, event_type, scene_pos in events:
+            start = time.perf_counter()
+            send_mouse(view, event_type, scene_pos)
+            QApplication.processEvents()
+            latency[kind].append(time.perf_counter() - start)
+            if kind == 'move':
+                frame_moves += 1
+            if kind == 'move' and frame_moves % moves_per_frame == 0:
+                # Кадр: по часам кадров, а не по реальному времени проигрывания
+                frame += 1
+                check_snap = frame * puzzle.FRAME_INTERVAL // puzzle.SNAP_CHECK_INTERVAL != \
+                    (frame - 1) * puzzle.FRAME_INTERVAL // puzzle.SNAP_CHECK_INTERVAL
+                start = time.perf_counter()
+                window.drag_moves.flush(force_snap_check=check_snap)
+                QApplication.processEvents()
+                latency['flush'].append(time.perf_counter() - start)
+    return latency, snaps[0], skipped
+
+
+def bench_replay_child(args):
+    """Дочерний процесс для bench_replay: один размер сетки, результат в JSON"""
+    before = rss_kb()
+    window = make_window(args.grid, args.image, args.seed)
+    window.show()
+    QApplication.processEvents()
+    if args.session:
+        with open(args.session, encoding='utf-8') as f:
+            sessions = json.load(f)['sessions']
+    else:
+        sessions = make_sessions(window.model, random.Random(args.seed), args.sessions, args.steps)
+        if args.record:
+            with open(args.record, 'w', encoding='utf-8') as f:
+                json.dump({'grid_size': args.grid, 'seed': args.seed, 'sessions': sessions}, f)
+
+    start = time.perf_counter()
+    latency, snaps, skipped = replay(window, sessions, args.moves_per_frame)
+    elapsed = time.perf_counter() - start
+    result = {
+        'grid_size': args.grid,
+        'pieces': len(window.pieces),
+        'sessions': len(sessions),
+        'skipped_sessions': skipped,
+        'events': sum(len(latency[kind]) for kind in ('press', 'move', 'release')),
+        'elapsed_s': elapsed,
+        'snaps': snaps,
+        'moves_per_frame': args.moves_per_frame,
+        'collapsed_moves': window.drag_moves.collapsed,
+        'placed': window.model.placed_count,
+        'latency_ms': {
+            kind: {
+                name: percentile(values, fraction) * 1e3
+                for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99), ('max', 1.0))
+            }
+            for kind, values in latency.items() if values
+        },
+        'rss_before_kb': before,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    }
+    print(json.dumps(result))
+
+
+def bench_replay(args):
+    """Проигрывание сеансов перетаскивания в игровом окне для разных размеров сетки"""
+    sizes = args.sizes
+    if args.session:
+        with open(args.session, encoding='utf-8') as f:
+            sizes = [json.load(f)['grid_size']]
+    print(f"{'grid':>6} {'events':>7} {'collapsed':>10} {'snaps':>6} {'move p50':>9} {'move p95':>9} "
+          f"{'flush p50':>10} {'flush p95':>10} {'flush p99':>10} {'release p95':>12} {'peak, MiB':>10}")
+    results = []
+    for grid_size in sizes:
+        command = [sys.executable, os.path.join(ROOT, 'benchmark.py'), '--seed', str(args.seed),
+                   '--image', args.image, '_replay', str(grid_size),
+                   '--sessions', str(args.sessions), '--steps', str(args.steps),
+                   '--moves-per-frame', str(args.moves_per_frame)]
+        for option in ('session', 'record'):
+            if getattr(args, option):
+                command += [f'--{option}', getattr(args, option)]
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.splitlines()[-1])
+        results.append(result)
+        latency = result['latency_ms']
+        move, flush, release = latency['move'], latency['flush'], latency['release']
+        print(f"{grid_size:>6} {result['events']:>7} {result['collapsed_moves']:>10} {result['snaps']:>6} "
+              f"{move['p50']:>9.3f} {move['p95']:>9.3f} {flush['p50']:>10.3f} {flush['p95']:>10.3f} "
+              f"{flush['p99']:>10.3f} {release['p95']:>12.3f} {result['peak_rss_kb'] / 1024:>10.1f}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'seed': args.seed, 'image': args.image, 'results': results}, f, indent=2)
+        print(f"results: {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--image', default=DEFAULT_IMAGE)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    drag = subparsers.add_parser('drag', help='поиск соседей при перетаскивании')
+    drag.add_argument('--sizes', type=int, nargs='+', default=[6, 12, 24, 48])
+    drag.add_argument('--moves', type=int, default=2000)
+    drag.set_defaults(func=bench_drag)
+
+    cluster = subparsers.add_parser('cluster', help='перетаскивание большой группы')
+    cluster.add_argument('--grid', type=int, default=30)
+    cluster.add_argument('--cluster', type=int, default=500)
+    cluster.add_argument('--moves', type=int, default=500)
+    cluster.set_defaults(func=bench_cluster)
+
+    memory = subparsers.add_parser('memory', help='пиковая память при открытии изображения')
+    memory.set_defaults(func=bench_memory)
+
+    decode = subparsers.add_parser('_decode')
+    decode.add_argument('mode', choices=['full', 'scaled'])
+    decode.set_defaults(func=bench_decode)
+
+    pieces = subparsers.add_parser('pieces', help='создание фрагментов')
+    pieces.add_argument('--sizes', type=int, nargs='+', default=[6, 50])
+    pieces.set_defaults(func=bench_pieces)
+
+    build_pieces = subparsers.add_parser('_pieces')
+    build_pieces.add_argument('mode', choices=['copy', 'shared'])
+    build_pieces.add_argument('grid', type=int)
+    build_pieces.set_defaults(func=bench_build_pieces)
+
+    startup = subparsers.add_parser('startup', help='этапы запуска игрового окна')
+    startup.add_argument('--sizes', type=int, nargs='+', default=[6, 30, 100])
+    startup.set_defaults(func=bench_startup)
+
+    launch = subparsers.add_parser('launch', help='от импорта до первого окна')
+    launch.add_argument('--runs', type=int, default=5)
+    launch.set_defaults(func=bench_launch)
+
+    render = subparsers.add_parser('render', help='время кадра при перетаскивании')
+    render.add_argument('--sizes', type=int, nargs='+', default=[6, 12, 24])
+    render.add_argument('--policies', nargs='+', default=list(puzzle.RENDER_POLICIES))
+    render.add_argument('--frames', type=int, default=200)
+    render.set_defaults(func=bench_render)
+
+    hints = subparsers.add_parser('hints', help='матрица несходства краев и подсказки')
+    hints.add_argument('--sizes', type=int, nargs='+', default=[10, 25, 50])
+    hints.set_defaults(func=bench_hints)
+
+    replay = subparsers.add_parser('replay', help='проигрывание сеансов перетаскивания')
+    replay.add_argument('--sizes', type=int, nargs='+', default=[6, 12, 24])
+    replay.add_argument('--output', help='файл для результатов в JSON')
+    replay.set_defaults(func=bench_replay)
+
+    replay_child = subparsers.add_parser('_replay')
+    replay_child.add_argument('grid', type=int)
+    replay_child.set_defaults(func=bench_replay_child)
+
+    for command in (replay, replay_child):
+        command.add_argument('--sessions', type=int, default=100)
+        command.add_argument('--steps', type=int, default=30, help='перемещений указателя в одном сеансе')
+        command.add_argument('--moves-per-frame', type=int, default=4,
+                             help='перемещений указателя за кадр (4 - мышь 250 Гц при 60 кадрах в секунду)')
+        command.add_argument('--session', help='записанные сеансы (JSON) вместо синтетических')
+        command.add_argument('--record', help='записать синтетические сеансы в JSON (при одном размере сетки)')
+
+    args = parser.parse_args()
+    # Пути к изображению, файлам сеансов и результатов указываются относительно папки запуска
+    for option in ('image', 'output', 'session', 'record'):
+        if getattr(args, option, None):
+            setattr(args, option, os.path.join(CALLER_DIR, getattr(args, option)))
+    app = QApplication.instance() or QApplication(sys.argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
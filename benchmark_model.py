@@ -0,0 +1,115 @@
+"""Замеры модели пазла без Qt: притягивание и объединение групп на больших досках.
+
+Запуск (QApplication и сцена не нужны):
+    python benchmark_model.py --grid 100 --moves 20000
+    python benchmark_model.py --grid 100 --model arrays
+"""
+import argparse
+import random
+import time
+
+from puzzle_model import PUZZLE_MODELS
+
+
+def scatter(model, rng, width, height):
+    """Раскладывает фрагменты в случайные места поля"""
+    positions = [
+        (rng.uniform(0, width - model.piece_width), rng.uniform(0, height - model.piece_height))
+        for _ in range(model.count)
+    ]
+    model.load_state(positions, list(range(model.count)), [False] * model.count)
+
+
+def bench_drags(model, rng, moves):
+    """Случайные перетаскивания: половина шагов кладет фрагмент рядом с соседом"""
+    width, height = model.bounds[2], model.bounds[3]
+    snaps = drops = 0
+    start = time.perf_counter()
+    for _ in range(moves):
+        piece_id = rng.randrange(model.count)
+        if model.placed[piece_id]:
+            continue
+        if rng.random() < 0.5:
+            neighbor = rng.choice(sorted(model.neighbor_ids(piece_id)))
+            x, y = model.target_next_to(piece_id, neighbor)
+            x += rng.uniform(-10, 10)
+            y += rng.uniform(-10, 10)
+        else:
+            x, y = rng.uniform(0, width), rng.uniform(0, height)
+        snaps += model.drag_to(piece_id, x, y)
+        if rng.random() < 0.1:
+            drops += 1
+            snaps += model.drop(piece_id)
+    return time.perf_counter() - start, snaps, drops
+
+
+def bench_assemble(model):
+    """Сборка пазла: каждую группу кладем почти на правильное место и отпускаем"""
+    start = time.perf_counter()
+    for piece_id in range(model.count):
+        if not model.placed[piece_id]:
+            x, y = model.correct[piece_id]
+            model.move_group_to(piece_id, x + 3, y - 2)
+            model.drop(piece_id)
+    return time.perf_counter() - start
+
+
+def bench_queries(model, repeats=100):
+    """Поиск фрагментов рядом со своими местами и проверка завершения"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        near = len(model.pieces_near_target())
+        model.is_complete()
+    return (time.perf_counter() - start) / repeats, near
+
+
+def bench_region_merge(model_type, grid_size, piece_size):
+    """Вся доска размещена, но разбита на одиночные фрагменты (как в старых сохранениях):
+    один drop должен соединить ее в одну группу"""
+    model = model_type(grid_size, piece_size, piece_size)
+    model.load_state(model.correct, list(range(model.count)), [True] * model.count)
+    start = time.perf_counter()
+    model.drop(model.count // 2)
+    elapsed = time.perf_counter() - start
+    groups = sum(1 for members in model.members if members)
+    if groups != 1:
+        raise SystemExit(f"region merge failed: {groups} groups left")
+    return elapsed, len(model.group_members(0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--grid', type=int, default=100)
+    parser.add_argument('--piece', type=int, default=7, help='размер фрагмента в пикселях')
+    parser.add_argument('--moves', type=int, default=20000)
+    parser.add_argument('--model', choices=sorted(PUZZLE_MODELS), default='lists')
+    args = parser.parse_args()
+
+    model_type = PUZZLE_MODELS[args.model]
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    model = model_type(args.grid, args.piece, args.piece)
+    side = args.grid * args.piece
+    model.bounds = (0, 0, side * 2, side * 2)
+    scatter(model, rng, side * 2, side * 2)
+    print(f"{model.count} pieces ({args.model}): build {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+    elapsed, snaps, drops = bench_drags(model, rng, args.moves)
+    groups = sum(1 for members in model.members if members)
+    print(f"drags: {elapsed / args.moves * 1e6:.1f} us/move, {snaps} snaps, {drops} drops, "
+          f"{groups} groups, largest {max(map(len, model.members))}")
+
+    elapsed, near = bench_queries(model)
+    print(f"queries: {elapsed * 1e6:.1f} us for near-target + completion, {near} near target")
+
+    elapsed = bench_assemble(model)
+    print(f"assemble: {elapsed * 1e3:.1f} ms, placed {model.placed_count}/{model.count}, "
+          f"complete {model.is_complete()}")
+
+    elapsed, merged = bench_region_merge(model_type, args.grid, args.piece)
+    print(f"region merge: {merged} pieces joined in one drop, {elapsed * 1e3:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,33 +3,570 @@ import os
 import json
 import time
 import random
+import hashlib
+import mmap
+import struct
+import array
+import logging
+import tempfile
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QPushButton, QLabel, QFrame,
     QVBoxLayout, QHBoxLayout, QGridLayout, QStackedWidget,
-    QListWidget, QListWidgetItem, QMessageBox, QGraphicsOpacityEffect,
-    QScrollArea, QGraphicsScene, QGraphicsView, QGraphicsPixmapItem,
-    QSizePolicy
+    QListWidget, QListWidgetItem, QMessageBox,
+    QScrollArea, QGraphicsScene, QGraphicsView,
+    QGraphicsItem, QGraphicsRectItem, QSizePolicy, QSpinBox
+)
+from PyQt6.QtGui import (
+    QPixmap, QPainter, QMouseEvent, QColor, QCursor, QIcon, QPalette, QFont, QPen,
+    QImage, QImageReader
 )
-from PyQt6.QtGui import QPixmap, QPainter, QMouseEvent, QColor, QCursor, QIcon, QPalette, QFont, QPen
 from PyQt6.QtCore import (
-    Qt, QPoint, QRect, QSize, QUrl, QPropertyAnimation,
-    QPointF, QRectF, QObject
+    Qt, QPoint, QRect, QSize, QSizeF, QUrl, QPropertyAnimation,
+    QPointF, QRectF, QObject, QRunnable, QThreadPool, QEvent, pyqtSignal
 )
-from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
 from PyQt6.QtCore import QTimer
 
+from puzzle_model import SCATTER_LAYOUTS, model_class, scatter_area
+
+logger = logging.getLogger('puzzle')
+
+# Сколько фрагментов создается за одну итерацию цикла событий при запуске
+PIECE_BUILD_CHUNK = 256
+
+# Файлы сохранения игры и сводки прогресса.
+# STATE_FILE - старый JSON-формат, который по-прежнему читается при загрузке
+SAVE_FILE = 'puzzle_state.bin'
+JOURNAL_FILE = 'puzzle_state.journal'
+STATE_FILE = 'puzzle_state.json'
+PROGRESS_FILE = 'puzzle_progress.json'
+
+# Двоичный снимок: сигнатура, поколение, размер сетки, число фрагментов,
+# длина пути к изображению; затем путь, позиции (double x, y), номера групп
+# (int32) и битовая маска размещенных фрагментов
+SAVE_MAGIC = b'YPZ1'
+SAVE_HEADER = struct.Struct('<4sIIII')
+# Журнал: сигнатура и поколение снимка, затем записи (id, x, y, группа, размещен)
+JOURNAL_MAGIC = b'YPJ1'
+JOURNAL_HEADER = struct.Struct('<4sI')
+JOURNAL_RECORD = struct.Struct('<Iddi?')
+
+# Кэш уменьшенных изображений досок: сигнатура, ширина, высота, длина строки
+# и формат QImage; затем пиксели (32 бита на точку) без сжатия
+BOARD_CACHE_MAGIC = b'YPB2'
+BOARD_CACHE_HEADER = struct.Struct('<4sIIII')
+# Предельный размер кэша; сверх него удаляются дольше всего не открывавшиеся доски
+BOARD_CACHE_LIMIT = 64 * 1024 * 1024
+
+# Автосохранение выполняется не чаще одного раза за столько секунд
+AUTOSAVE_DELAY = 5
+
+# Перемещения мыши применяются не чаще одного раза за кадр (мс),
+# а притягивание к соседям проверяется не чаще одного раза за SNAP_CHECK_INTERVAL (мс)
+FRAME_INTERVAL = 16
+SNAP_CHECK_INTERVAL = 50
+
+# Размеры сетки, доступные при выборе своей сложности
+MIN_GRID_SIZE = 2
+MAX_GRID_SIZE = 100
+
+# Сколько раз общее изображение фрагментов можно уменьшить вдвое
+# для отрисовки мелких фрагментов при отдалении
+MIPMAP_LEVELS = 6
+# Если фрагмент на экране меньше стольких пикселей, доска рисуется одним элементом
+FLATTEN_PIECE_PIXELS = 6
+
+# Непрозрачность подсказки и сколько ее масштабированных вариантов хранить
+HINT_OPACITY = 0.3
+HINT_VARIANTS = 4
+
+# Непрозрачность фонового изображения поля и цвет линий сетки
+BOARD_IMAGE_OPACITY = 0.2
+# Выше этого масштаба вида слой поля не увеличивается: он растягивается
+# при копировании, а линии сетки рисуются прямо в видимой области
+BOARD_LAYER_MAX_SCALE = 1.0
+BOARD_GRID_COLOR = "#CCCCCC"
+# Сетка не рисуется, если ячейка на экране меньше стольких пикселей
+BOARD_GRID_MIN_CELL = 4
+
+# Названия тем для файла прогресса
+THEME_NAMES = {'landscape': 'Пейзаж', 'architecture': 'Архитектура', 'animals': 'Животные'}
+
+# Настройки игры; отсутствующие в файле значения берутся по умолчанию
+SETTINGS_FILE = 'puzzle_settings.json'
+DEFAULT_SETTINGS = {
+    'render_policy': 'balanced',
+    # Раскладка фрагментов при новой раздаче, см. SCATTER_LAYOUTS
+    'scatter_layout': 'jitter',
+    # Реализация модели доски, см. PUZZLE_MODELS и model_class
+    'model_backend': 'auto',
+    # Фоновая музыка и звуки; аудиосистема запускается только если что-то включено
+    'music': True,
+    'sound': True
+}
+
+# Через сколько миллисекунд после появления главного окна запускается музыка
+MUSIC_START_DELAY = 300
+
+# Короткие звуки игры и сколько копий каждого звука может звучать одновременно.
+# Берется первый найденный файл: WAV можно держать декодированным, а другие
+# форматы (старый snap.mp3) играются одним QMediaPlayer без перекрытия
+SOUND_EFFECTS = {'snap': (os.path.join('sounds', 'snap.wav'), os.path.join('sounds', 'snap.mp3'))}
+SOUND_VOICES = 4
+
+# Подсказка хода: рамки вокруг фрагмента и места для него, сколько миллисекунд они видны
+SUGGESTION_COLOR = QColor(255, 215, 0)
+SUGGESTION_TIME = 2000
+
+# Политики отрисовки игрового поля:
+#   viewport_update - какие области QGraphicsView перерисовываются при движении фрагментов
+#   item_cache - кэширование отрисованных фрагментов
+#   antialiasing - сглаживание линий
+#   smooth_while_dragging - оставлять ли сглаживание масштабированных картинок во время перетаскивания
+RENDER_POLICIES = {
+    'quality': {
+        'viewport_update': QGraphicsView.ViewportUpdateMode.FullViewportUpdate,
+        'item_cache': QGraphicsItem.CacheMode.NoCache,
+        'antialiasing': True,
+        'smooth_while_dragging': True
+    },
+    'balanced': {
+        'viewport_update': QGraphicsView.ViewportUpdateMode.MinimalViewportUpdate,
+        'item_cache': QGraphicsItem.CacheMode.DeviceCoordinateCache,
+        'antialiasing': True,
+        'smooth_while_dragging': False
+    },
+    'fast': {
+        'viewport_update': QGraphicsView.ViewportUpdateMode.BoundingRectViewportUpdate,
+        'item_cache': QGraphicsItem.CacheMode.DeviceCoordinateCache,
+        'antialiasing': False,
+        'smooth_while_dragging': False
+    }
+}
+
+def load_settings():
+    """Читает настройки из SETTINGS_FILE поверх значений по умолчанию"""
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        with open(SETTINGS_FILE, 'r') as f:
+            saved = json.load(f)
+        if isinstance(saved, dict):
+            settings.update(saved)
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    return settings
+
+_multimedia = None
+
+def load_multimedia():
+    """Модуль QtMultimedia, загружаемый при первом обращении; None, если он недоступен"""
+    global _multimedia
+    if _multimedia is None:
+        try:
+            from PyQt6 import QtMultimedia
+            _multimedia = QtMultimedia
+        except ImportError as error:
+            logger.warning('sound is disabled: %s', error)
+            _multimedia = False
+    return _multimedia or None
+
+_hints = None
+
+def load_hints():
+    """Модуль подсказок puzzle_hints (нужен NumPy), загружаемый при первом обращении; None, если он недоступен"""
+    global _hints
+    if _hints is None:
+        try:
+            import puzzle_hints
+            _hints = puzzle_hints
+        except ImportError as error:
+            logger.warning('hints are disabled: %s', error)
+            _hints = False
+    return _hints or None
+
+def load_scaled_image(image_path, size):
+    """Декодирует изображение сразу в размер, вписанный в size, с сохранением пропорций.
+
+    Для форматов, умеющих уменьшать картинку при декодировании (JPEG),
+    полноразмерный буфер в памяти не создается.
+    """
+    reader = QImageReader(image_path)
+    source_size = reader.size()
+    if not source_size.isValid():
+        return reader.read()
+
+    target_size = source_size.scaled(size, Qt.AspectRatioMode.KeepAspectRatio)
+    if target_size.width() <= source_size.width():
+        reader.setScaledSize(target_size)
+        return reader.read()
+
+    # Увеличение при декодировании не поддерживается - масштабируем после чтения
+    return reader.read().scaled(
+        target_size,
+        Qt.AspectRatioMode.KeepAspectRatio,
+        Qt.TransformationMode.SmoothTransformation
+    )
+
+def write_bytes_atomic(path, data):
+    """Запись через временный файл: при сбое старый файл остается целым"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def write_json_atomic(path, data):
+    write_bytes_atomic(path, json.dumps(data).encode('utf-8'))
+
+def _little_endian(values):
+    """Массив array в порядке байтов файла сохранения"""
+    if sys.byteorder == 'big':
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def write_snapshot(state):
+    """Полный снимок: упакованные позиции, номера групп и битовая маска размещенных.
+
+    Вместе со снимком начинается новый пустой журнал того же поколения.
+    """
+    path_bytes = state['image_path'].encode('utf-8')
+    placed = state['placed']
+    placed_bits = bytearray((len(placed) + 7) // 8)
+    for i, is_placed in enumerate(placed):
+        if is_placed:
+            placed_bits[i >> 3] |= 1 << (i & 7)
+
+    data = b''.join((
+        SAVE_HEADER.pack(SAVE_MAGIC, state['generation'], state['grid_size'], len(placed), len(path_bytes)),
+        path_bytes,
+        _little_endian(state['positions']),
+        _little_endian(state['groups']),
+        bytes(placed_bits)
+    ))
+    write_bytes_atomic(SAVE_FILE, data)
+    write_bytes_atomic(JOURNAL_FILE, JOURNAL_HEADER.pack(JOURNAL_MAGIC, state['generation']))
+
+    # Старое JSON-сохранение больше не нужно
+    if os.path.exists(STATE_FILE):
+        os.remove(STATE_FILE)
+
+def append_journal(records):
+    """Дописывает в журнал записи (id, x, y, группа, размещен) измененных фрагментов"""
+    with open(JOURNAL_FILE, 'ab') as f:
+        f.write(b''.join(JOURNAL_RECORD.pack(*record) for record in records))
+        f.flush()
+        os.fsync(f.fileno())
+
+def read_snapshot_header():
+    """(поколение, размер сетки, путь к изображению) снимка на диске или None.
+
+    None и тогда, когда журнал на диске начат не для этого снимка.
+    """
+    try:
+        with open(SAVE_FILE, 'rb') as f:
+            header = f.read(SAVE_HEADER.size)
+            if len(header) < SAVE_HEADER.size:
+                return None
+            magic, generation, grid_size, _, path_length = SAVE_HEADER.unpack(header)
+            image_path = f.read(path_length).decode('utf-8', errors='replace')
+        with open(JOURNAL_FILE, 'rb') as f:
+            journal = f.read(JOURNAL_HEADER.size)
+    except OSError:
+        return None
+    if magic != SAVE_MAGIC or len(journal) < JOURNAL_HEADER.size or \
+            JOURNAL_HEADER.unpack(journal) != (JOURNAL_MAGIC, generation):
+        return None
+    return generation, grid_size, image_path
+
+def read_snapshot(grid_size, image_path):
+    """Читает двоичный снимок и применяет журнал.
+
+    Возвращает словарь с позициями, группами и флагами размещения
+    или None, если сохранения нет или оно от другой игры.
+    """
+    try:
+        with open(SAVE_FILE, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    if len(data) < SAVE_HEADER.size:
+        return None
+    magic, generation, saved_grid, count, path_length = SAVE_HEADER.unpack_from(data)
+    offset = SAVE_HEADER.size
+    saved_path = data[offset:offset + path_length].decode('utf-8', errors='replace')
+    offset += path_length
+    if magic != SAVE_MAGIC or saved_grid != grid_size or saved_path != image_path:
+        return None
+
+    positions = array.array('d')
+    groups = array.array('i')
+    positions_end = offset + 2 * count * positions.itemsize
+    groups_end = positions_end + count * groups.itemsize
+    placed_end = groups_end + (count + 7) // 8
+    if len(data) < placed_end:
+        return None
+    positions.frombytes(data[offset:positions_end])
+    groups.frombytes(data[positions_end:groups_end])
+    if sys.byteorder == 'big':
+        positions.byteswap()
+        groups.byteswap()
+    placed_bits = data[groups_end:placed_end]
+    placed = [bool(placed_bits[i >> 3] & (1 << (i & 7))) for i in range(count)]
+
+    state = {
+        'generation': generation,
+        'positions': [(positions[2 * i], positions[2 * i + 1]) for i in range(count)],
+        'groups': list(groups),
+        'placed': placed,
+        'journal_records': 0
+    }
+
+    # Журнал применяется только к снимку своего поколения;
+    # недописанная последняя запись отбрасывается
+    try:
+        with open(JOURNAL_FILE, 'rb') as f:
+            journal = f.read()
+    except OSError:
+        return state
+    if len(journal) < JOURNAL_HEADER.size:
+        return state
+    journal_magic, journal_generation = JOURNAL_HEADER.unpack_from(journal)
+    if journal_magic != JOURNAL_MAGIC or journal_generation != generation:
+        return state
+    records_end = JOURNAL_HEADER.size + \
+        (len(journal) - JOURNAL_HEADER.size) // JOURNAL_RECORD.size * JOURNAL_RECORD.size
+    for piece_id, x, y, group, is_placed in JOURNAL_RECORD.iter_unpack(journal[JOURNAL_HEADER.size:records_end]):
+        if piece_id < count:
+            state['positions'][piece_id] = (x, y)
+            state['groups'][piece_id] = group
+            state['placed'][piece_id] = is_placed
+            state['journal_records'] += 1
+    return state
+
+def read_legacy_state(grid_size, image_path):
+    """Читает старое JSON-сохранение в том же виде, что и read_snapshot"""
+    try:
+        with open(STATE_FILE, 'r') as f:
+            saved = json.load(f)
+        if saved['grid_size'] != grid_size or saved['image_path'] != image_path:
+            return None
+        piece_states = sorted(saved['pieces'], key=lambda ps: ps['id'])
+        positions = [tuple(ps['pos']) for ps in piece_states]
+        placed = [ps['is_placed'] for ps in piece_states]
+        if all('group' in ps for ps in piece_states):
+            groups = [ps['group'] for ps in piece_states]
+        else:
+            # Самый старый формат: списки связанных фрагментов
+            parent = list(range(len(piece_states)))
+
+            def find(i):
+                while parent[i] != i:
+                    parent[i] = parent[parent[i]]
+                    i = parent[i]
+                return i
+
+            for ps in piece_states:
+                for pid in ps['connected_pieces']:
+                    parent[find(pid)] = find(ps['id'])
+            groups = [find(i) for i in range(len(piece_states))]
+    except (FileNotFoundError, json.JSONDecodeError, KeyError, IndexError, TypeError):
+        return None
+    return {'generation': None, 'positions': positions, 'groups': groups,
+            'placed': placed, 'journal_records': 0}
+
+class SaveWriterSignals(QObject):
+    # Число записей журнала, которые не попали на диск
+    failed = pyqtSignal(int)
+
+class SaveWriter(QRunnable):
+    """Фоновая задача: запись снимка или дописывание журнала"""
+    def __init__(self, progress, snapshot=None, records=()):
+        super().__init__()
+        self.progress = progress
+        self.snapshot = snapshot
+        self.records = records
+        self.signals = SaveWriterSignals()
+
+    def run(self):
+        # Ошибка из фонового потока завершила бы все приложение:
+        # несохраненная игра сохранится при следующей записи
+        try:
+            if self.snapshot is not None:
+                write_snapshot(self.snapshot)
+            else:
+                append_journal(self.records)
+            write_json_atomic(PROGRESS_FILE, self.progress)
+        except OSError as error:
+            logger.warning('game is not saved: %s', error)
+            self.signals.failed.emit(len(self.records))
+
+class Autosaver(QObject):
+    """Отложенное автосохранение игры.
+
+    После изменения запись выполняется не чаще одного раза в delay секунд:
+    снимок делается в потоке GUI, а сериализация и запись - в фоновом потоке.
+    Обычно в журнал дописываются только измененные фрагменты; когда журнал
+    становится длиннее самой доски, он сворачивается в новый полный снимок.
+    """
+    def __init__(self, game_window, delay=AUTOSAVE_DELAY):
+        super().__init__(game_window)
+        self.game_window = game_window
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(int(delay * 1000))
+        self.timer.timeout.connect(self.flush)
+        # Один поток, чтобы записи не обгоняли друг друга
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        # Поколение последнего снимка на диске (None - снимка еще нет)
+        self.generation = None
+        self.journal_records = 0
+        # После неудачной записи журнал на диске неполон
+        self.snapshot_needed = False
+        self.dirty_pieces = set()
+
+    def schedule(self, pieces=()):
+        """Отмечаем изменение; повторные изменения до записи таймер не сдвигают"""
+        self.dirty_pieces.update(pieces)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def reset(self, generation=None, journal_records=0):
+        """Состояние на диске после загрузки или новой раздачи"""
+        self.generation = generation
+        self.journal_records = journal_records
+        self.snapshot_needed = False
+        self.dirty_pieces.clear()
+
+    def flush(self):
+        self.timer.stop()
+        window = self.game_window
+        if not window.pieces_ready:
+            # Доска еще строится - сохраним позже
+            self.timer.start()
+            return
+        progress = window.snapshot_progress()
+        # Журнал дописывается только к своему снимку: другое окно могло
+        # с тех пор записать на диск снимок своей игры
+        if self.generation is None or self.snapshot_needed or \
+                self.journal_records + len(self.dirty_pieces) > len(window.pieces) or \
+                read_snapshot_header() != (self.generation, window.grid_size, window.image_path):
+            task = SaveWriter(progress, snapshot=self.next_snapshot())
+        else:
+            records = window.journal_records(self.dirty_pieces)
+            self.journal_records += len(records)
+            task = SaveWriter(progress, records=records)
+        task.signals.failed.connect(self.save_failed)
+        self.dirty_pieces.clear()
+        self.pool.start(task)
+
+    def save_failed(self, lost_records):
+        # Что попало на диск, неизвестно: следующая запись будет полным снимком
+        # нового поколения, поэтому старый журнал к нему не применится
+        self.journal_records = max(0, self.journal_records - lost_records)
+        self.snapshot_needed = True
+
+    def next_snapshot(self):
+        self.generation = (self.generation or 0) + 1
+        self.journal_records = 0
+        self.snapshot_needed = False
+        return self.game_window.snapshot_state(self.generation)
+
+    def save_now(self):
+        """Синхронный полный снимок (при выходе и завершении пазла)"""
+        self.cancel()
+        task = SaveWriter(self.game_window.snapshot_progress(), snapshot=self.next_snapshot())
+        task.signals.failed.connect(self.save_failed)
+        task.run()
+
+    def cancel(self):
+        """Отменяет запланированную запись и дожидается уже начатой"""
+        self.timer.stop()
+        self.dirty_pieces.clear()
+        self.pool.waitForDone()
+
+class DragCoalescer(QObject):
+    """Объединяет перемещения мыши при перетаскивании.
+
+    Мышь с высокой частотой опроса присылает события чаще, чем обновляется
+    экран. Запоминается только последняя позиция указателя, и она применяется
+    один раз за кадр; притягивание к соседям проверяется с ограниченной частотой.
+    """
+    def __init__(self, game_window):
+        super().__init__(game_window)
+        self.game_window = game_window
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.setInterval(FRAME_INTERVAL)
+        self.timer.timeout.connect(self.flush)
+        self.piece = None
+        self.pending_pos = None
+        self.last_snap_check = 0.0
+        # Сколько событий перемещения было поглощено более поздними
+        self.collapsed = 0
+
+    def move(self, piece, scene_pos):
+        """Запоминает новую позицию фрагмента до следующего кадра"""
+        if self.pending_pos is not None:
+            self.collapsed += 1
+        self.piece = piece
+        self.pending_pos = scene_pos
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self, force_snap_check=False):
+        """Применяет последнюю позицию; при отпускании проверка притягивания обязательна"""
+        self.timer.stop()
+        if self.pending_pos is None:
+            return
+        piece, pos = self.piece, self.pending_pos
+        self.piece = self.pending_pos = None
+        now = time.perf_counter()
+        check_snap = force_snap_check or (now - self.last_snap_check) * 1000 >= SNAP_CHECK_INTERVAL
+        if check_snap:
+            self.last_snap_check = now
+        # Фрагмент мог встать на место, притянувшись в предыдущем кадре
+        if not piece.is_placed:
+            piece.drag_to(pos, check_snap)
+
+    def cancel(self):
+        self.timer.stop()
+        self.piece = self.pending_pos = None
+
 class MusicPlayer:
+    """Фоновая музыка.
+
+    Плеер и список треков создаются при первом запуске музыки,
+    поэтому импорт модуля и открытие окон не затрагивают аудиосистему.
+    """
     def __init__(self):
-        self.player = QMediaPlayer()
-        self.audio_output = QAudioOutput()
-        self.player.setAudioOutput(self.audio_output)
+        self.multimedia = None
+        self.player = None
+        self.audio_output = None
+        self.volume = 1.0
         self.current_track = 0
         self.is_playing = False
         self.playlist = []
+
+    def ensure_backend(self):
+        """Создает плеер при первом обращении; False, если звук недоступен"""
+        if self.player is not None:
+            return True
+        self.multimedia = load_multimedia()
+        if self.multimedia is None:
+            return False
+        self.player = self.multimedia.QMediaPlayer()
+        self.audio_output = self.multimedia.QAudioOutput()
+        self.audio_output.setVolume(self.volume)
+        self.player.setAudioOutput(self.audio_output)
         self.load_playlist()
         
         # Подключаем сигнал окончания воспроизведения
         self.player.mediaStatusChanged.connect(self.handle_media_status_changed)
+        return True
         
     def load_playlist(self):
         # Загружаем все музыкальные файлы из папки songs
@@ -38,9 +575,14 @@ class MusicPlayer:
         
         self.playlist = [os.path.join('songs', f) for f in os.listdir('songs')
                         if f.endswith(('.mp3', '.wav'))]
+
+    def start_later(self, delay=MUSIC_START_DELAY):
+        """Запускает музыку после появления окна, если она включена в настройках"""
+        if load_settings()['music']:
+            QTimer.singleShot(delay, self.play)
         
     def play(self):
-        if not self.playlist:
+        if not self.ensure_backend() or not self.playlist:
             return
             
         if not self.is_playing:
@@ -53,14 +595,15 @@ class MusicPlayer:
             self.player.play()
             
     def handle_media_status_changed(self, status):
-        if status == QMediaPlayer.MediaStatus.EndOfMedia:
+        if status == self.multimedia.QMediaPlayer.MediaStatus.EndOfMedia:
             # Переходим к следующему треку
             self.current_track = (self.current_track + 1) % len(self.playlist)
             self.play_current_track()
             
     def stop(self):
         self.is_playing = False
-        self.player.stop()
+        if self.player is not None:
+            self.player.stop()
         
     def toggle(self):
         if self.is_playing:
@@ -69,11 +612,85 @@ class MusicPlayer:
             self.play()
             
     def set_volume(self, volume):
-        self.audio_output.setVolume(volume / 100.0)
+        self.volume = volume / 100.0
+        if self.audio_output is not None:
+            self.audio_output.setVolume(self.volume)
 
-# Глобальный объект для управления музыкой
+# Глобальный объект для управления музыкой; аудиосистема запускается лениво
 music_player = MusicPlayer()
 
+class SoundEffects:
+    """Короткие звуки игры, общие для всех окон.
+
+    Каждый звук загружается один раз в несколько QSoundEffect (голосов):
+    они хранят уже декодированный PCM, а несколько голосов позволяют звукам
+    перекрываться, например при цепочке соединений фрагментов.
+    QSoundEffect играет только WAV, поэтому звуки в других форматах
+    играются одним QMediaPlayer, как раньше.
+    """
+    def __init__(self, sounds=SOUND_EFFECTS, voice_count=SOUND_VOICES):
+        self.sounds = sounds
+        self.voice_count = voice_count
+        # Голоса по имени звука; None - звуки еще не загружались
+        self.voices = None
+        self.next_voice = {}
+        # Проигрыватели (QMediaPlayer, QAudioOutput) звуков не в формате WAV
+        self.players = {}
+
+    def preload(self):
+        """Загружает звуки; повторные вызовы ничего не делают"""
+        if self.voices is not None:
+            return
+        self.voices = {}
+        multimedia = load_multimedia()
+        if multimedia is None:
+            return
+        for name, paths in self.sounds.items():
+            path = next((path for path in paths if os.path.exists(path)), None)
+            if path is None:
+                continue
+            url = QUrl.fromLocalFile(os.path.abspath(path))
+            if not path.lower().endswith('.wav'):
+                logger.warning('%s is not found, playing %s without overlapping', paths[0], path)
+                player = multimedia.QMediaPlayer()
+                audio_output = multimedia.QAudioOutput()
+                player.setAudioOutput(audio_output)
+                player.setSource(url)
+                self.players[name] = (player, audio_output)
+                continue
+            voices = []
+            for _ in range(self.voice_count):
+                effect = multimedia.QSoundEffect()
+                effect.setSource(url)
+                voices.append(effect)
+            self.voices[name] = voices
+            self.next_voice[name] = 0
+
+    def play(self, name):
+        self.preload()
+        if name in self.players:
+            player, _ = self.players[name]
+            player.setPosition(0)
+            player.play()
+            return
+        voices = self.voices.get(name)
+        if not voices:
+            return
+        # Берем первый свободный голос по кругу, а если заняты все -
+        # тот, который запускался раньше остальных
+        start = self.next_voice[name]
+        index = start
+        for offset in range(len(voices)):
+            candidate = (start + offset) % len(voices)
+            if not voices[candidate].isPlaying():
+                index = candidate
+                break
+        self.next_voice[name] = (index + 1) % len(voices)
+        voices[index].play()
+
+# Глобальный объект для звуков; загружаются при первом игровом окне
+sound_effects = SoundEffects()
+
 class MusicButton(QPushButton):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -105,46 +722,139 @@ class MusicButton(QPushButton):
             for button in window.findChildren(MusicButton):
                 button.setChecked(music_player.is_playing)
 
-class PuzzlePiece(QGraphicsPixmapItem):
-    def __init__(self, pixmap, correct_pos, piece_id, game_window, parent=None):
-        # Инициализация базового класса QGraphicsPixmapItem
-        super().__init__(pixmap, parent)
-        
-        # Сохраняем исходное изображение фрагмента
-        self.original_pixmap = pixmap
-        self.piece_pixmap = pixmap
+class MipmapChain:
+    """Уменьшенные вдвое копии изображения для отрисовки при отдалении.
+
+    Уровни строятся по мере надобности, каждый из предыдущего.
+    """
+    def __init__(self, pixmap, levels=MIPMAP_LEVELS):
+        self.levels = [pixmap]
+        self.max_level = levels
+
+    def level_for(self, lod):
+        """Самый маленький уровень, в котором пикселей не меньше, чем на экране.
+
+        Возвращает изображение и его масштаб по x и y относительно исходного.
+        """
+        level = 0
+        while level < self.max_level and lod <= 0.5 ** (level + 1):
+            level += 1
+        while len(self.levels) <= level:
+            previous = self.levels[-1]
+            self.levels.append(previous.scaled(
+                max(1, previous.width() // 2), max(1, previous.height() // 2),
+                Qt.AspectRatioMode.IgnoreAspectRatio,
+                Qt.TransformationMode.SmoothTransformation
+            ))
+        pixmap, source = self.levels[level], self.levels[0]
+        return pixmap, pixmap.width() / source.width(), pixmap.height() / source.height()
+
+class BoardOverview(QGraphicsItem):
+    """Все фрагменты одним элементом для сильного отдаления.
+
+    Фрагменты рисуются одним вызовом drawPixmapFragments из уменьшенной копии
+    изображения, а сами элементы фрагментов в это время ничего не рисуют.
+    После перемещения группы обновляются только ее фрагменты.
+    """
+    def __init__(self, game_window, bounds):
+        super().__init__()
+        self.game_window = game_window
+        self.bounds = QRectF(bounds)
+        self.fragments = None
+        self.fragment_level = None
+        self.setZValue(1)
+        self.setAcceptedMouseButtons(Qt.MouseButton.NoButton)
+
+    def boundingRect(self):
+        return self.bounds
+
+    def paint(self, painter, option, widget=None):
+        lod = option.levelOfDetailFromTransform(painter.worldTransform())
+        pixmap, scale_x, scale_y = self.game_window.mipmaps.level_for(lod)
+        if self.fragments is None or self.fragment_level is not pixmap:
+            self.build_fragments(scale_x, scale_y)
+            self.fragment_level = pixmap
+        painter.drawPixmapFragments(self.fragments, pixmap)
+
+    def build_fragments(self, scale_x, scale_y):
+        model = self.game_window.model
+        width, height = model.piece_width, model.piece_height
+        self.fragments = []
+        for piece_id, (x, y) in enumerate(model.positions()):
+            source_x, source_y = model.correct[piece_id]
+            self.fragments.append(QPainter.PixmapFragment.create(
+                QPointF(x + width / 2, y + height / 2),
+                QRectF(source_x * scale_x, source_y * scale_y, width * scale_x, height * scale_y),
+                1 / scale_x, 1 / scale_y
+            ))
+
+    def move_pieces(self, piece_ids):
+        """Переносит фрагменты сдвинутой группы"""
+        if self.fragments is not None:
+            model = self.game_window.model
+            for piece_id in piece_ids:
+                x, y = model.position(piece_id)
+                fragment = self.fragments[piece_id]
+                fragment.x = x + model.piece_width / 2
+                fragment.y = y + model.piece_height / 2
+        self.update()
+
+class PuzzlePiece(QGraphicsItem):
+    """Изображение фрагмента; положение, группы и притягивание хранит PuzzleModel"""
+    def __init__(self, source_pixmap, source_rect, piece_id, game_window, parent=None):
+        # Инициализация базового класса QGraphicsItem
+        super().__init__(parent)
         
-        # Сохраняем правильную позицию фрагмента на игровом поле
-        self.correct_pos = correct_pos
+        # Фрагмент рисуется прямо из общего изображения, без собственной копии пикселей
+        self.source_pixmap = source_pixmap
+        self.source_rect = QRectF(source_rect)
+        # boundingRect вызывается при каждой перерисовке, поэтому вычисляется один раз
+        self.rect = QRectF(QPointF(0, 0), self.source_rect.size())
         
-        # Уникальный идентификатор фрагмента
+        # Уникальный идентификатор фрагмента (индекс в модели)
         self.piece_id = piece_id
         
         # Ссылка на главное окно игры
         self.game_window = game_window
         
-        # Флаги состояния фрагмента
-        self.dragging = False  # Перетаскивается ли фрагмент
-        self.is_placed = False  # Находится ли фрагмент на своем месте
+        # Перетаскивается ли фрагмент
+        self.dragging = False
         
         # Смещение курсора при перетаскивании
         self.offset = QPointF()
         
-        # Множество связанных фрагментов (соединенных с текущим)
-        self.connected_pieces = set()
-        
         # Масштаб фрагмента (используется для эффекта при наведении)
         self._scale = 1.0
         
         # Настройка взаимодействия с фрагментом
         self.setAcceptHoverEvents(True)  # Разрешаем события наведения мыши
         self.setCursor(Qt.CursorShape.OpenHandCursor)  # Устанавливаем курсор
-        self.setFlag(QGraphicsPixmapItem.GraphicsItemFlag.ItemIsMovable)  # Разрешаем перемещение
-        self.setFlag(QGraphicsPixmapItem.GraphicsItemFlag.ItemIsSelectable)  # Разрешаем выделение
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsMovable)  # Разрешаем перемещение
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsSelectable)  # Разрешаем выделение
         
-        # Установка начальной позиции и слоя
-        self.setPos(correct_pos)
+        # Установка слоя
         self.setZValue(1)  # Z-индекс определяет, какой фрагмент будет отображаться поверх других
+        self.setCacheMode(game_window.render_policy['item_cache'])
+
+    def boundingRect(self):
+        return self.rect
+
+    def paint(self, painter, option, widget=None):
+        lod = option.levelOfDetailFromTransform(painter.worldTransform())
+        if lod > 0.5:
+            painter.drawPixmap(self.rect, self.source_pixmap, self.source_rect)
+            return
+        # При отдалении рисуем из уменьшенной копии изображения
+        pixmap, scale_x, scale_y = self.game_window.mipmaps.level_for(lod)
+        source = self.source_rect
+        painter.drawPixmap(self.rect, pixmap, QRectF(
+            source.x() * scale_x, source.y() * scale_y,
+            source.width() * scale_x, source.height() * scale_y
+        ))
+
+    @property
+    def is_placed(self):
+        return self.game_window.model.placed[self.piece_id]
 
     def hoverEnterEvent(self, event):
         """Обработка события наведения курсора на фрагмент"""
@@ -161,180 +871,195 @@ class PuzzlePiece(QGraphicsPixmapItem):
 
     def mousePressEvent(self, event):
         """Обработка нажатия кнопки мыши"""
-        if event.button() == Qt.MouseButton.LeftButton and not self.is_placed:
+        if event.button() == Qt.MouseButton.LeftButton:
+            # Выделенный фрагмент задает группу для кнопки «Собрать»
+            self.scene().clearSelection()
+            self.setSelected(True)
+        if event.button() == Qt.MouseButton.LeftButton and self.game_window.pieces_ready \
+                and not self.is_placed:
             self.dragging = True
             self.offset = event.pos()  # Запоминаем позицию курсора относительно фрагмента
             self.setCursor(Qt.CursorShape.ClosedHandCursor)
-            self.setZValue(3)  # Поднимаем фрагмент над всеми при перетаскивании
-            
-            # Поднимаем все связанные фрагменты
-            for piece in self.connected_pieces:
-                piece.setZValue(3)
+            self.game_window.begin_drag()
+            # Поднимаем фрагмент (вместе с его группой) над всеми при перетаскивании
+            self.drag_item().setZValue(3)
 
     def mouseReleaseEvent(self, event):
         """Обработка отпускания кнопки мыши"""
         if event.button() == Qt.MouseButton.LeftButton and self.dragging:
             self.dragging = False
             self.setCursor(Qt.CursorShape.OpenHandCursor)
-            self.setZValue(1)
-            
-            # Проверяем, можно ли соединить фрагмент с другими
-            self.check_connection()
+            # Сначала применяем последнее отложенное перемещение
+            drag_moves = self.game_window.drag_moves
+            drag_moves.flush(force_snap_check=True)
+            logger.debug('drag finished, %d move events collapsed so far', drag_moves.collapsed)
+            self.drag_item().setZValue(1)
+            self.game_window.end_drag()
+            self.drop()
 
     def mouseMoveEvent(self, event):
         """Обработка перемещения мыши при перетаскивании"""
         if self.dragging and not self.is_placed:
-            # Вычисляем новую позицию с учетом смещения курсора
-            new_pos = self.mapToScene(event.pos() - self.offset)
-            
-            # Ограничиваем движение пределами сцены
-            scene_rect = self.scene().sceneRect()
-            new_pos.setX(max(0, min(new_pos.x(), scene_rect.width() - self.pixmap().width())))
-            new_pos.setY(max(0, min(new_pos.y(), scene_rect.height() - self.pixmap().height())))
-            
-            # Перемещаем текущий фрагмент
-            self.setPos(new_pos)
-            
-            # Перемещаем все связанные фрагменты
-            delta = new_pos - self.pos()
-            for piece in self.connected_pieces:
-                new_piece_pos = piece.pos() + delta
-                new_piece_pos.setX(max(0, min(new_piece_pos.x(), scene_rect.width() - piece.pixmap().width())))
-                new_piece_pos.setY(max(0, min(new_piece_pos.y(), scene_rect.height() - piece.pixmap().height())))
-                piece.setPos(new_piece_pos)
-            
-            # Проверяем близость к другим фрагментам
-            self.check_nearby_pieces()
-
-    def check_connection(self):
-        """Проверка возможности соединения с другими фрагментами"""
-        # Проверяем, находится ли фрагмент близко к своей правильной позиции
-        current_pos = self.pos()
-        distance_to_correct = (current_pos - self.correct_pos).manhattanLength()
-        
-        if distance_to_correct < 30:
-            # Устанавливаем фрагмент точно на его место
-            self.setPos(self.correct_pos)
-            self.is_placed = True
-            self.game_window.play_snap_sound()
-            
-            # Проверяем и соединяем с соседними фрагментами
-            self.check_and_connect_neighbors()
-            
-            # Проверяем завершение пазла
-            self.game_window.check_completion()
-            return True
-            
-        # Если фрагмент не на своем месте, пробуем соединить с другими размещенными фрагментами
-        return self.try_connect_to_placed_neighbors()
-
-    def try_connect_to_placed_neighbors(self):
-        """Попытка соединения с уже размещенными соседними фрагментами"""
-        for piece in self.game_window.pieces:
-            if piece != self and piece.is_placed and piece not in self.connected_pieces:
-                if self.are_neighbors(piece):  # Если фрагменты должны быть соседями
-                    distance = (self.pos() - piece.pos()).manhattanLength()
-                    if distance < 30:  # Если фрагменты достаточно близко
-                        # Определяем правильную позицию относительно соседнего фрагмента
-                        if self.correct_pos.x() < piece.correct_pos.x():
-                            target_pos = piece.pos() - QPointF(self.pixmap().width(), 0)
-                        elif self.correct_pos.x() > piece.correct_pos.x():
-                            target_pos = piece.pos() + QPointF(piece.pixmap().width(), 0)
-                        elif self.correct_pos.y() < piece.correct_pos.y():
-                            target_pos = piece.pos() - QPointF(0, self.pixmap().height())
-                        else:
-                            target_pos = piece.pos() + QPointF(0, piece.pixmap().height())
-
-                        # Перемещаем фрагмент на позицию и соединяем
-                        self.setPos(target_pos)
-                        self.connect_with(piece)
-                        self.game_window.play_snap_sound()
-                        return True
-        return False
-
-    def check_nearby_pieces(self):
-        """Проверка близости к другим фрагментам во время перетаскивания"""
-        if self.is_placed:
+            # Вычисляем новую позицию с учетом смещения курсора;
+            # применяется она один раз за кадр
+            self.game_window.drag_moves.move(self, self.mapToScene(event.pos() - self.offset))
+
+    def drag_to(self, new_pos, check_snap=True):
+        """Перемещает фрагмент вместе с группой так, чтобы он оказался в new_pos"""
+        if self.game_window.model.drag_to(self.piece_id, new_pos.x(), new_pos.y(), check_snap):
+            self.game_window.on_snap()
+
+    def drop(self):
+        """Фрагмент отпущен: пробуем соединить его и сохраняем изменения"""
+        model = self.game_window.model
+        if model.drop(self.piece_id):
+            self.game_window.on_snap()
+        self.game_window.autosave.schedule(model.group_members(self.piece_id))
+
+    def drag_item(self):
+        """Элемент сцены, который двигается при перетаскивании: группа или сам фрагмент"""
+        return self.game_window.group_item(self.game_window.model.find(self.piece_id))
+
+class PieceCluster(QGraphicsItem):
+    """Общий родитель соединенных фрагментов: группа двигается одним setPos"""
+    def __init__(self):
+        super().__init__()
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemHasNoContents)
+        self.setZValue(1)
+
+    def boundingRect(self):
+        return QRectF()
+
+    def paint(self, painter, option, widget=None):
+        pass
+
+    def add_piece(self, piece, x, y):
+        """Переносит фрагмент в группу; (x, y) - его смещение от начала группы"""
+        piece.setParentItem(self)
+        piece.setPos(x, y)
+        piece.setZValue(1)
+
+class HintItem(QGraphicsItem):
+    """Полупрозрачная подсказка под фрагментами.
+
+    Непрозрачность заранее смешана с пикселями, поэтому подсказка рисуется
+    обычным копированием готового изображения. Для каждого масштаба вида
+    до 1:1 хранится свой вариант, чтобы при отдалении не масштабировать
+    картинку в каждом кадре; при увеличении растягивается вариант 1:1.
+    """
+    def __init__(self, pixmap, opacity=HINT_OPACITY):
+        super().__init__()
+        self.pixmap = pixmap
+        self.opacity = opacity
+        self.variants = {}
+        self.setAcceptedMouseButtons(Qt.MouseButton.NoButton)
+
+    def boundingRect(self):
+        return QRectF(self.pixmap.rect())
+
+    def variant(self, scale):
+        """Готовое изображение для масштаба вида, округленного до четверти.
+
+        Больше исходного размера вариант не бывает: деталей в нем не прибавится,
+        а память росла бы квадратично с увеличением.
+        """
+        key = min(1.0, max(0.25, round(scale * 4) / 4))
+        pixmap = self.variants.get(key)
+        if pixmap is None:
+            image = QImage(
+                (QSizeF(self.pixmap.size()) * key).toSize(),
+                QImage.Format.Format_ARGB32_Premultiplied
+            )
+            image.fill(Qt.GlobalColor.transparent)
+            painter = QPainter(image)
+            painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+            painter.setOpacity(self.opacity)
+            painter.drawPixmap(QRectF(image.rect()), self.pixmap, QRectF(self.pixmap.rect()))
+            painter.end()
+            pixmap = QPixmap.fromImage(image)
+            if len(self.variants) >= HINT_VARIANTS:
+                # Выбрасываем самый старый вариант
+                del self.variants[next(iter(self.variants))]
+            self.variants[key] = pixmap
+        return pixmap
+
+    def paint(self, painter, option, widget=None):
+        pixmap = self.variant(option.levelOfDetailFromTransform(painter.worldTransform()))
+        painter.drawPixmap(self.boundingRect(), pixmap, QRectF(pixmap.rect()))
+
+class BoardLayer:
+    """Фон поля (изображение с низкой непрозрачностью) и сетка, собранные в одно изображение.
+
+    Изображение пересобирается только при изменении размера, масштаба,
+    сетки или фоновой картинки. Масштаб слоя ограничен BOARD_LAYER_MAX_SCALE,
+    поэтому при увеличении память под него не растет.
+    """
+    def __init__(self, grid_size, image=None):
+        self.grid_size = grid_size
+        self.image = image
+        self.cache = None
+        self.cache_key = None
+
+    def set_grid_size(self, grid_size):
+        self.grid_size = grid_size
+        self.cache = None
+
+    def set_image(self, image):
+        self.image = image
+        self.cache = None
+
+    def pixmap(self, size, scale=1.0):
+        """Слой для области size (в логических единицах) при масштабе scale.
+
+        Если scale больше BOARD_LAYER_MAX_SCALE, сетки в слое нет, см. draw_grid.
+        """
+        with_grid = scale <= BOARD_LAYER_MAX_SCALE
+        scale = min(scale, BOARD_LAYER_MAX_SCALE)
+        key = (size.width(), size.height(), round(scale, 3), with_grid)
+        if self.cache is None or self.cache_key != key:
+            self.cache = self.render(size, scale, with_grid)
+            self.cache_key = key
+        return self.cache
+
+    def render(self, size, scale, with_grid):
+        pixmap = QPixmap((QSizeF(size) * scale).toSize())
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        painter.scale(scale, scale)
+
+        # Рисуем фоновое изображение с низкой непрозрачностью
+        if self.image is not None:
+            painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+            painter.setOpacity(BOARD_IMAGE_OPACITY)
+            painter.drawPixmap(QRect(QPoint(0, 0), size), self.image)
+            painter.setOpacity(1.0)
+
+        if with_grid:
+            self.draw_grid(painter, size, scale, QRectF(QPointF(0, 0), QSizeF(size)))
+        painter.end()
+        return pixmap
+
+    def draw_grid(self, painter, size, scale, rect):
+        """Линии сетки поля размера size, попадающие в rect (в координатах поля)"""
+        pen = QPen(QColor(BOARD_GRID_COLOR))
+        pen.setWidth(1)
+        pen.setCosmetic(True)
+        painter.setPen(pen)
+        cell_width = size.width() // self.grid_size
+        cell_height = size.height() // self.grid_size
+        if min(cell_width, cell_height) * scale < BOARD_GRID_MIN_CELL:
+            # Слишком частая сетка сливается в сплошной серый фон
             return
-            
-        for piece in self.game_window.pieces:
-            if piece != self and piece not in self.connected_pieces:
-                if self.are_neighbors(piece):
-                    distance = (self.pos() - piece.pos()).manhattanLength()
-                    if distance < 30:
-                        self.snap_to_piece(piece)
-                        return
-
-    def snap_to_piece(self, other_piece):
-        """Прикрепление фрагмента к другому фрагменту"""
-        # Определяем правильную позицию относительно другого фрагмента
-        if self.correct_pos.x() < other_piece.correct_pos.x():
-            target_pos = other_piece.pos() - QPointF(self.pixmap().width(), 0)
-        elif self.correct_pos.x() > other_piece.correct_pos.x():
-            target_pos = other_piece.pos() + QPointF(other_piece.pixmap().width(), 0)
-        elif self.correct_pos.y() < other_piece.correct_pos.y():
-            target_pos = other_piece.pos() - QPointF(0, self.pixmap().height())
-        else:
-            target_pos = other_piece.pos() + QPointF(0, other_piece.pixmap().height())
-
-        # Перемещаем фрагмент и соединяем
-        self.setPos(target_pos)
-        self.connect_with(other_piece)
-        self.game_window.play_snap_sound()
-
-    def check_and_connect_neighbors(self):
-        """Проверка и соединение с соседними фрагментами"""
-        for piece in self.game_window.pieces:
-            if piece != self and piece.is_placed and piece not in self.connected_pieces:
-                if self.are_neighbors(piece):
-                    distance = (self.pos() - piece.pos()).manhattanLength()
-                    if distance < 30:
-                        self.connect_with(piece)
-                        piece.check_and_connect_neighbors()
-
-    def connect_with(self, other_piece):
-        """Соединение фрагмента с другим фрагментом"""
-        if other_piece not in self.connected_pieces:
-            # Объединяем все связанные фрагменты из обеих групп
-            all_connected = self.connected_pieces | other_piece.connected_pieces | {self, other_piece}
-            # Обновляем связи для всех фрагментов
-            for piece in all_connected:
-                piece.connected_pieces = all_connected - {piece}
-                piece.is_placed = True
-                piece.setZValue(1)
-            
-            # Проверяем завершение пазла
-            self.game_window.check_completion()
-
-    def are_neighbors(self, other_piece):
-        """Проверка, должны ли фрагменты быть соседями в собранном пазле"""
-        dx = abs(self.correct_pos.x() - other_piece.correct_pos.x())
-        dy = abs(self.correct_pos.y() - other_piece.correct_pos.y())
-        piece_size = self.pixmap().width()
-        # Фрагменты соседние, если находятся рядом по горизонтали или вертикали
-        return (dx == piece_size and dy == 0) or (dx == 0 and dy == piece_size)
-
-class PuzzleGroup:
-    def __init__(self, pieces):
-        self.pieces = pieces
-        for p in pieces:
-            p.group = self
-
-    def move_group(self, moved_piece, delta):
-        for p in self.pieces:
-            if p != moved_piece:
-                new_pos = p.pos() + delta
-                # Ограничиваем движение группы в пределах окна
-                parent_rect = moved_piece.parent().rect()
-                new_pos.setX(max(0, min(new_pos.x(), parent_rect.width() - p.width())))
-                new_pos.setY(max(0, min(new_pos.y(), parent_rect.height() - p.height())))
-                p.move(new_pos)
-
-    def merge_with(self, other_group):
-        if other_group != self:
-            self.pieces.extend(other_group.pieces)
-            for piece in other_group.pieces:
-                piece.group = self
+
+        # Горизонтальные линии сетки
+        for i in range(max(1, int(rect.top() // cell_height)), min(self.grid_size, int(rect.bottom() // cell_height) + 1)):
+            y = i * cell_height
+            painter.drawLine(0, y, size.width(), y)
+
+        # Вертикальные линии сетки
+        for i in range(max(1, int(rect.left() // cell_width)), min(self.grid_size, int(rect.right() // cell_width) + 1)):
+            x = i * cell_width
+            painter.drawLine(x, 0, x, size.height())
 
 class GameField(QFrame):
     def __init__(self, width, height, grid_size, is_puzzle_field=False, parent=None):
@@ -344,6 +1069,8 @@ class GameField(QFrame):
         self.cell_width = width // grid_size
         self.cell_height = height // grid_size
         self.is_puzzle_field = is_puzzle_field
+        # Фон и сетка рисуются из готового слоя
+        self.layer = BoardLayer(grid_size)
         
         # Устанавливаем стиль в зависимости от типа поля
         if is_puzzle_field:
@@ -365,69 +1092,108 @@ class GameField(QFrame):
         super().paintEvent(event)
         if self.is_puzzle_field:
             painter = QPainter(self)
-            
-            # Рисуем фоновое изображение с низкой непрозрачностью
-            if hasattr(self, 'background_image'):
-                painter.setOpacity(0.2)
-                painter.drawPixmap(self.rect(), self.background_image)
-                painter.setOpacity(1.0)
-
-            # Рисуем сетку
-            pen = QPen(QColor("#CCCCCC"))
-            pen.setWidth(1)
-            painter.setPen(pen)
-
-            # Рисуем горизонтальные линии сетки
-            for i in range(1, self.grid_size):
-                y = i * self.cell_height
-                painter.drawLine(0, y, self.width(), y)
-
-            # Рисуем вертикальные линии сетки
-            for i in range(1, self.grid_size):
-                x = i * self.cell_width
-                painter.drawLine(x, 0, x, self.height())
+            painter.drawPixmap(0, 0, self.layer.pixmap(self.size()))
 
     def set_background_image(self, pixmap):
         if self.is_puzzle_field:
             self.background_image = pixmap
+            self.layer.set_image(pixmap)
             self.update()
 
+class PuzzleView(QGraphicsView):
+    """Вид игрового поля; сетка поля рисуется в фоне сцены из готового слоя"""
+    def __init__(self, scene, parent=None):
+        super().__init__(scene, parent)
+        self.board_layer = None
+        self.board_rect = QRectF()
+
+    def set_board(self, board_rect, grid_size, image=None):
+        self.board_rect = QRectF(board_rect)
+        self.board_layer = BoardLayer(grid_size, image)
+        self.resetCachedContent()
+        self.viewport().update()
+
+    def drawBackground(self, painter, rect):
+        super().drawBackground(painter, rect)
+        if self.board_layer is None or not rect.intersects(self.board_rect):
+            return
+        # До BOARD_LAYER_MAX_SCALE слой строится сразу в масштабе вида и только копируется
+        scale = painter.worldTransform().m11()
+        size = self.board_rect.size().toSize()
+        pixmap = self.board_layer.pixmap(size, scale)
+        painter.drawPixmap(self.board_rect, pixmap, QRectF(pixmap.rect()))
+        if scale > BOARD_LAYER_MAX_SCALE:
+            # При увеличении сетка рисуется поверх растянутого слоя, только в видимой области
+            painter.save()
+            painter.translate(self.board_rect.topLeft())
+            self.board_layer.draw_grid(painter, size, scale, rect.translated(-self.board_rect.topLeft()))
+            painter.restore()
+
 class GameWindow(QWidget):
-    def __init__(self, image_path, grid_size):
+    def __init__(self, image_path, grid_size, seed=None):
         super().__init__()
+        # Длительности этапов запуска в миллисекундах (first_paint - от начала запуска)
+        self.startup_start = time.perf_counter()
+        self.startup_timings = {}
         self.image_path = image_path
         self.grid_size = grid_size
+        # Генератор для раздачи; с seed раскладка воспроизводима (для замеров)
+        self.rng = random.Random(seed)
         self.pieces = []
-        self.original_image = QPixmap(image_path)
+        # Состояние доски без Qt; фрагменты и группы на сцене лишь отображают его
+        self.model = None
+        # Общие графические родители групп по id корня группы в модели
+        self.clusters = {}
+        # При сильном отдалении доска рисуется одним элементом (см. update_level_of_detail)
+        self.overview = None
+        self.flattened = False
         
         # Initialize timer variables
         self.elapsed_time = 0
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_timer)
         
-        # Scale image
+        # Decode the image straight to the playing size, or map a recently played
+        # board from the disk cache; the full-resolution buffer is never kept,
+        # the preview is derived from the scaled copy. The QImage itself is kept
+        # because the pixmap may share its pixels, and cached pixels live in the mapped file
         max_size = 700
-        self.scaled_image = self.original_image.scaled(
-            max_size, max_size,
+        self.source_image = board_cache.scaled_image(image_path, QSize(max_size, max_size))
+        self.scaled_image = QPixmap.fromImage(self.source_image)
+        self.preview_image = self.scaled_image.scaled(
+            250, 250,
             Qt.AspectRatioMode.KeepAspectRatio,
             Qt.TransformationMode.SmoothTransformation
         )
+        self.mipmaps = MipmapChain(self.scaled_image)
+        self.report_stage('decode_image', self.startup_start)
         
+        self.settings = load_settings()
+        self.render_policy = RENDER_POLICIES.get(
+            self.settings['render_policy'], RENDER_POLICIES[DEFAULT_SETTINGS['render_policy']]
+        )
+
         self.is_completed = False
         self.hint_visible = False
+        # Рамки подсказки хода; скрываются по таймеру
+        self.suggestion_frames = []
+        self.suggestion_timer = QTimer(self)
+        self.suggestion_timer.setSingleShot(True)
+        self.suggestion_timer.timeout.connect(self.hide_suggestion)
         self.scene = QGraphicsScene()
         self.zoom_factor = 1.0
-        
-        # Загружаем сохраненное состояние после создания scaled_image
-        self.load_saved_state()
+        self.autosave = Autosaver(self)
+        self.drag_moves = DragCoalescer(self)
+
+        # Фрагменты создаются частями уже после появления окна
+        self.pieces_ready = False
+        self.pending_build = None
         self.initUI()
+        self.initialize_puzzle()
         
-        # Load snap sound
-        self.snap_player = QMediaPlayer()
-        self.snap_audio = QAudioOutput()
-        self.snap_player.setAudioOutput(self.snap_audio)
-        if os.path.exists('sounds/snap.mp3'):
-            self.snap_player.setSource(QUrl.fromLocalFile(os.path.abspath('sounds/snap.mp3')))
+        # Звуки общие для всех окон; загружаем их после появления окна
+        if self.settings['sound']:
+            QTimer.singleShot(0, sound_effects.preload)
             
         # Start the timer when the game begins
         self.timer.start(1000)  # Update every second
@@ -440,6 +1206,19 @@ class GameWindow(QWidget):
             seconds = self.elapsed_time % 60
             self.timer_label.setText(f"Время: {minutes:02d}:{seconds:02d}")
 
+    def report_stage(self, stage, start):
+        """Запоминает длительность этапа запуска и пишет ее в лог"""
+        elapsed = (time.perf_counter() - start) * 1000
+        self.startup_timings[stage] = elapsed
+        logger.info("%s (%dx%d): %s %.1f ms", self.image_path, self.grid_size, self.grid_size, stage, elapsed)
+
+    def eventFilter(self, obj, event):
+        """Замеряем время до первой отрисовки игрового поля"""
+        if event.type() == QEvent.Type.Paint and obj is self.view.viewport():
+            obj.removeEventFilter(self)
+            self.report_stage('first_paint', self.startup_start)
+        return super().eventFilter(obj, event)
+
     def initUI(self):
         self.setWindowTitle('Собери пазл')
         
@@ -478,12 +1257,7 @@ class GameWindow(QWidget):
         
         # Preview image
         preview_label = QLabel()
-        preview_pixmap = self.original_image.scaled(
-            250, 250,
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
-        preview_label.setPixmap(preview_pixmap)
+        preview_label.setPixmap(self.preview_image)
         preview_label.setStyleSheet("""
             QLabel {
                 background-color: white;
@@ -574,13 +1348,27 @@ class GameWindow(QWidget):
         hint_btn.clicked.connect(self.toggle_hint)
         buttons_layout.addWidget(hint_btn)
 
+        move_btn = QPushButton('Ход')
+        move_btn.setStyleSheet(back_btn.styleSheet())
+        move_btn.setFixedSize(100, 40)
+        move_btn.clicked.connect(self.suggest_move)
+        buttons_layout.addWidget(move_btn)
+
+        assemble_btn = QPushButton('Собрать')
+        assemble_btn.setStyleSheet(back_btn.styleSheet())
+        assemble_btn.setFixedSize(100, 40)
+        assemble_btn.clicked.connect(self.assemble_selected)
+        buttons_layout.addWidget(assemble_btn)
+
         # Add help text
         help_text = QLabel(
             "Управление:\n"
             "• Левая кнопка мыши - перетаскивание\n"
             "• + / - - масштабирование\n"
             "• ⟲ - сброс масштаба\n"
-            "• Фрагменты автоматически\n  соединяются при сближении"
+            "• Фрагменты автоматически\n  соединяются при сближении\n"
+            "• Ход - подсказка по краям\n  фрагментов\n"
+            "• Собрать - достроить группу\n  выделенного фрагмента"
         )
         help_text.setStyleSheet("""
             QLabel {
@@ -599,12 +1387,10 @@ class GameWindow(QWidget):
         main_layout.addLayout(left_panel)
 
         # Create graphics view for puzzle area
-        self.view = QGraphicsView(self.scene)
+        self.view = PuzzleView(self.scene)
         self.view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
         self.view.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
-        self.view.setRenderHint(QPainter.RenderHint.Antialiasing)
-        self.view.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
-        self.view.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.FullViewportUpdate)
+        self.apply_render_policy()
         self.view.setMinimumSize(500, 400)
         
         # Разрешаем изменение размера QGraphicsView
@@ -620,23 +1406,60 @@ class GameWindow(QWidget):
         """)
         
         # Set scene size
-        self.scene.setSceneRect(QRectF(0, 0, self.scaled_image.width(), self.scaled_image.height()))
+        # Сцена включает поле сборки и область раздачи справа от него
+        piece_width = self.scaled_image.width() // self.grid_size
+        piece_height = self.scaled_image.height() // self.grid_size
+        self.scatter_area = scatter_area(
+            self.grid_size * self.grid_size, piece_width, piece_height, self.scaled_image.width()
+        )
+        self.scene.setSceneRect(QRectF(
+            0, 0,
+            max(self.scaled_image.width(), self.scatter_area[2]),
+            max(self.scaled_image.height(), self.scatter_area[3])
+        ))
+
+        # Сетка поля сборки в фоне сцены
+        self.view.set_board(
+            QRectF(0, 0, piece_width * self.grid_size, piece_height * self.grid_size),
+            self.grid_size
+        )
         
         # Add view to layout
         main_layout.addWidget(self.view)
-        
-        # Initialize puzzle pieces
-        self.initialize_puzzle()
+        self.view.viewport().installEventFilter(self)
+
+    def apply_render_policy(self):
+        """Настраивает вид и фрагменты согласно текущей политике отрисовки"""
+        policy = self.render_policy
+        self.view.setViewportUpdateMode(policy['viewport_update'])
+        self.view.setRenderHint(QPainter.RenderHint.Antialiasing, policy['antialiasing'])
+        self.view.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        for piece in self.pieces:
+            piece.setCacheMode(policy['item_cache'])
+
+    def set_render_policy(self, name):
+        self.render_policy = RENDER_POLICIES[name]
+        self.apply_render_policy()
+
+    def begin_drag(self):
+        """На время перетаскивания отключаем сглаживание, если политика это позволяет"""
+        if not self.render_policy['smooth_while_dragging']:
+            self.view.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, False)
+
+    def end_drag(self):
+        self.view.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
 
     def zoom(self, factor):
         """Масштабирование игрового поля"""
         self.zoom_factor *= factor
         self.view.scale(factor, factor)
+        self.update_level_of_detail()
 
     def reset_zoom(self):
         """Сброс масштаба к исходному значению"""
         self.view.resetTransform()
         self.zoom_factor = 1.0
+        self.update_level_of_detail()
 
     def resizeEvent(self, event):
         """Обработка изменения размера окна"""
@@ -645,92 +1468,280 @@ class GameWindow(QWidget):
         self.view.fitInView(self.scene.sceneRect(), Qt.AspectRatioMode.KeepAspectRatio)
         # Восстанавливаем текущий масштаб
         self.view.scale(self.zoom_factor, self.zoom_factor)
+        self.update_level_of_detail()
+
+    def update_level_of_detail(self):
+        """Переключает отрисовку отдельными фрагментами и общим элементом доски"""
+        if not self.pieces_ready:
+            return
+        flattened = self.view.transform().m11() * self.model.piece_width < FLATTEN_PIECE_PIXELS
+        if flattened == self.flattened:
+            return
+        self.flattened = flattened
+        # Фрагменты остаются на сцене для мыши, но перестают рисоваться сами
+        for piece in self.pieces:
+            piece.setFlag(QGraphicsItem.GraphicsItemFlag.ItemHasNoContents, flattened)
+        self.overview.fragments = None
+        self.overview.setVisible(flattened)
 
     def toggle_hint(self, checked):
         self.hint_visible = checked
         if checked:
             if not hasattr(self, 'hint_pixmap'):
-                self.hint_pixmap = self.scene.addPixmap(self.scaled_image)
-                effect = QGraphicsOpacityEffect()
-                effect.setOpacity(0.3)
-                self.hint_pixmap.setGraphicsEffect(effect)
+                self.hint_pixmap = HintItem(self.scaled_image)
+                self.scene.addItem(self.hint_pixmap)
             self.hint_pixmap.show()
         else:
             if hasattr(self, 'hint_pixmap'):
                 self.hint_pixmap.hide()
 
+    def edge_matrix(self):
+        """Несходство краев фрагментов текущей доски; None, если подсказки недоступны"""
+        hints = load_hints()
+        if hints is None or not self.pieces_ready or \
+                self.grid_size * self.grid_size > hints.EDGE_MATRIX_MAX_PIECES:
+            return None
+        image_key = (self.image_path, self.scaled_image.width(), self.scaled_image.height())
+        return hints.edge_matrix(image_key, self.grid_size, self.scaled_pixels)
+
+    def scaled_pixels(self):
+        image = self.source_image.convertToFormat(QImage.Format.Format_RGB32)
+        bits = image.constBits()
+        bits.setsize(image.sizeInBytes())
+        return load_hints().pixels_from_buffer(bits, image.width(), image.height(), image.bytesPerLine())
+
+    def suggest_move(self):
+        """Показывает фрагмент, который лучше всего подходит к краю другого, и место для него"""
+        matrix = self.edge_matrix()
+        if matrix is None:
+            return
+        hints = load_hints()
+        move = hints.suggest_move(self.model, matrix)
+        if move is None:
+            return
+        piece_id, other_id, direction = move
+        x, y = self.model.position(piece_id)
+        target_x, target_y = hints.target_position(self.model, piece_id, other_id, direction)
+        width, height = self.model.piece_width, self.model.piece_height
+        self.show_suggestion([QRectF(x, y, width, height), QRectF(target_x, target_y, width, height)])
+        self.scene.clearSelection()
+        self.pieces[piece_id].setSelected(True)
+
+    def show_suggestion(self, rects):
+        """Рамки подсказки поверх фрагментов на SUGGESTION_TIME миллисекунд"""
+        self.hide_suggestion()
+        pen = QPen(SUGGESTION_COLOR, 3)
+        pen.setCosmetic(True)
+        for rect in rects:
+            frame = QGraphicsRectItem(rect)
+            frame.setPen(pen)
+            frame.setZValue(4)
+            self.scene.addItem(frame)
+            self.suggestion_frames.append(frame)
+        self.view.ensureVisible(rects[-1])
+        self.suggestion_timer.start(SUGGESTION_TIME)
+
+    def hide_suggestion(self):
+        for frame in self.suggestion_frames:
+            self.scene.removeItem(frame)
+        self.suggestion_frames.clear()
+
+    def assemble_selected(self):
+        """Достраивает группу выделенного фрагмента подходящими по краям фрагментами"""
+        selected = [item for item in self.scene.selectedItems() if isinstance(item, PuzzlePiece)]
+        matrix = self.edge_matrix()
+        if not selected or matrix is None:
+            return
+        piece_id = selected[0].piece_id
+        attached = load_hints().assemble_group(self.model, matrix, piece_id)
+        logger.debug('assembled %d pieces around piece %d', len(attached), piece_id)
+        if attached:
+            self.on_snap()
+            self.autosave.schedule(self.model.group_members(piece_id))
+
+    def group_item(self, root):
+        """Элемент сцены группы: общий родитель или одиночный фрагмент"""
+        cluster = self.clusters.get(root)
+        return cluster if cluster is not None else self.pieces[root]
+
+    def group_moved(self, root):
+        """Модель сдвинула группу - переносим ее элемент на сцене"""
+        x, y = self.model.position(root)
+        self.group_item(root).setPos(QPointF(x, y))
+        if self.flattened:
+            self.overview.move_pieces(self.model.group_members(root))
+
+    def groups_merged(self, root, absorbed_root, absorbed_ids):
+        """Модель объединила группы - переносим фрагменты под общего родителя"""
+        model = self.model
+        cluster = self.clusters.get(root)
+        if cluster is None:
+            # Группа была одиночным фрагментом
+            cluster = self.add_cluster(root, [root])
+        for piece_id in absorbed_ids:
+            cluster.add_piece(self.pieces[piece_id], *model.group_offset(piece_id))
+        absorbed_cluster = self.clusters.pop(absorbed_root, None)
+        if absorbed_cluster is not None:
+            self.scene.removeItem(absorbed_cluster)
+
+    def add_cluster(self, root, piece_ids):
+        """Создает общего родителя группы в начале ее координат"""
+        cluster = PieceCluster()
+        cluster.setPos(QPointF(*self.model.position(root)))
+        self.scene.addItem(cluster)
+        for piece_id in piece_ids:
+            cluster.add_piece(self.pieces[piece_id], *self.model.group_offset(piece_id))
+        self.clusters[root] = cluster
+        return cluster
+
+    def on_snap(self):
+        """Фрагмент притянулся к месту или к соседу"""
+        self.play_snap_sound()
+        self.check_completion()
+
+    def clear_pieces(self):
+        """Удаляет все фрагменты и группы со сцены"""
+        for cluster in self.clusters.values():
+            self.scene.removeItem(cluster)
+        for piece in self.pieces:
+            if piece.parentItem() is None:
+                self.scene.removeItem(piece)
+        if self.overview is not None:
+            self.scene.removeItem(self.overview)
+            self.overview = None
+        self.flattened = False
+        self.clusters.clear()
+        self.pieces.clear()
+        self.drag_moves.cancel()
+        self.pending_build = None
+        self.pieces_ready = False
+        self.model = None
+
     def initialize_puzzle(self):
-        if not self.load_saved_state():
+        """Загружает сохранение или раздает новую игру"""
+        start = time.perf_counter()
+        state = self.read_saved_state()
+        self.report_stage('parse_save', start)
+        if state is None:
             # Если нет сохраненного состояния, создаем новую игру
             self.create_new_puzzle()
+        else:
+            self.build_pieces(state)
 
-    def create_new_puzzle(self):
-        # Piece dimensions
+    def create_new_puzzle(self, chunked=True):
+        """Новая раздача: фрагменты раскладываются в области справа от поля"""
         piece_width = self.scaled_image.width() // self.grid_size
         piece_height = self.scaled_image.height() // self.grid_size
+        piece_count = self.grid_size * self.grid_size
+        layout = SCATTER_LAYOUTS.get(self.settings['scatter_layout'], SCATTER_LAYOUTS[DEFAULT_SETTINGS['scatter_layout']])
+        positions = layout(piece_count, piece_width, piece_height, self.scatter_area, self.rng)
+
+        self.build_pieces({
+            'generation': None,
+            'positions': positions,
+            'groups': list(range(piece_count)),
+            'placed': [False] * piece_count,
+            'journal_records': 0
+        }, chunked)
+
+    def read_saved_state(self):
+        """Сохранение текущей игры: сначала двоичное, затем старое JSON"""
+        state = read_snapshot(self.grid_size, self.image_path) or \
+            read_legacy_state(self.grid_size, self.image_path)
+        if state is None or len(state['positions']) != self.grid_size * self.grid_size:
+            return None
+        return state
+
+    def build_pieces(self, state, chunked=True):
+        """Создает фрагменты по состоянию доски.
+
+        Большие доски строятся частями по PIECE_BUILD_CHUNK фрагментов
+        между итерациями цикла событий, чтобы окно появлялось сразу.
+        """
+        self.pieces_ready = False
+        build = self.iter_build_pieces(state)
+        self.pending_build = build
+        if not chunked:
+            for _ in build:
+                pass
+            return
 
-        # Calculate margins for piece distribution
-        margin_x = 50
-        margin_y = 50
-        available_width = self.width() - self.scaled_image.width() - margin_x * 2
-        available_height = self.height() - margin_y * 2
+        def build_next_chunk():
+            # Доска могла быть пересоздана, пока ждали следующей итерации
+            if self.pending_build is not build:
+                return
+            try:
+                next(build)
+            except StopIteration:
+                return
+            QTimer.singleShot(0, build_next_chunk)
 
-        # Create list of possible positions for pieces
-        field_positions = []
-        rows = (available_height // piece_height) + 1
-        cols = (available_width // piece_width) + 1
-        
-        for row in range(rows):
-            for col in range(cols):
-                x = margin_x + col * (piece_width + 10)  # Add 10px spacing between pieces
-                y = margin_y + row * (piece_height + 10)
-                if x + piece_width < self.width() and y + piece_height < self.height():
-                    field_positions.append(QPointF(x, y))
-
-        # Shuffle positions
-        random.shuffle(field_positions)
-
-        # Create puzzle pieces
-        for row in range(self.grid_size):
-            for col in range(self.grid_size):
-                # Cut out piece from image
-                piece_rect = QRect(
-                    col * piece_width,
-                    row * piece_height,
-                    piece_width,
-                    piece_height
-                )
-                piece_pixmap = self.scaled_image.copy(piece_rect)
-                
-                # Correct position on game field
-                correct_pos = QPointF(
-                    col * piece_width,
-                    row * piece_height
-                )
-                
-                # Create piece
-                piece = PuzzlePiece(
-                    piece_pixmap,
-                    correct_pos,
-                    len(self.pieces),
-                    self
-                )
-                
-                # Add piece to scene
-                self.scene.addItem(piece)
-                
-                # Place at random position
-                pos_index = row * self.grid_size + col
-                if pos_index < len(field_positions):
-                    piece.setPos(field_positions[pos_index])
-                
-                self.pieces.append(piece)
+        build_next_chunk()
+
+    def iter_build_pieces(self, state):
+        start = time.perf_counter()
+        piece_width = self.scaled_image.width() // self.grid_size
+        piece_height = self.scaled_image.height() // self.grid_size
+
+        # Сначала восстанавливаем состояние модели, затем создаем его отображение
+        model_type = model_class(self.settings['model_backend'])
+        model = model_type(self.grid_size, piece_width, piece_height)
+        model.load_state(state['positions'], state['groups'], state['placed'])
+        rect = self.scene.sceneRect()
+        model.bounds = (rect.left(), rect.top(), rect.right(), rect.bottom())
+        self.model = model
+
+        # Создаем все фрагменты в правильном порядке
+        for piece_id in range(model.count):
+            row, col = divmod(piece_id, self.grid_size)
+
+            # Область фрагмента в общем изображении
+            piece_rect = QRect(
+                col * piece_width,
+                row * piece_height,
+                piece_width,
+                piece_height
+            )
+
+            piece = PuzzlePiece(
+                self.scaled_image,
+                piece_rect,
+                piece_id,
+                self
+            )
+            piece.setPos(QPointF(*model.position(piece_id)))
+
+            # Добавляем фрагмент на сцену и в список
+            self.scene.addItem(piece)
+            self.pieces.append(piece)
+
+            if (piece_id + 1) % PIECE_BUILD_CHUNK == 0:
+                yield
+
+        # После создания всех фрагментов собираем группы под общих родителей
+        for root, members in enumerate(model.members):
+            if len(members) > 1:
+                self.add_cluster(root, members)
+        model.listener = self
+
+        # Раздача может положить фрагменты и за пределами sceneRect
+        self.overview = BoardOverview(self, self.scene.itemsBoundingRect().united(self.scene.sceneRect()))
+        self.overview.hide()
+        self.scene.addItem(self.overview)
+
+        self.pending_build = None
+        self.pieces_ready = True
+        self.update_level_of_detail()
+        self.autosave.reset(state['generation'], state['journal_records'])
+        if state['generation'] is None:
+            # Новая раздача или старое сохранение: записываем полный снимок
+            self.autosave.schedule()
+        self.report_stage('build_pieces', start)
 
     def check_completion(self):
         """Проверка завершения сборки пазла"""
         # Проверяем, все ли фрагменты на своих местах
-        if not self.is_completed and all(piece.is_placed and 
-            (piece.pos() - piece.correct_pos).manhattanLength() < 1 for piece in self.pieces):
+        if not self.is_completed and self.pieces_ready and self.model.is_complete():
             self.is_completed = True
             # Stop the timer when puzzle is completed
             self.timer.stop()
@@ -790,9 +1801,7 @@ class GameWindow(QWidget):
     def restart_game(self):
         """Перезапуск игры"""
         # Удаляем все фрагменты
-        for piece in self.pieces:
-            self.scene.removeItem(piece)
-        self.pieces.clear()
+        self.clear_pieces()
         
         # Сбрасываем флаг завершения
         self.is_completed = False
@@ -803,95 +1812,47 @@ class GameWindow(QWidget):
         # Создаем новую игру
         self.create_new_puzzle()
 
-    def save_state(self):
-        # Сохраняем состояние игры
-        state = {
+    def snapshot_state(self, generation):
+        """Полный снимок состояния для двоичного сохранения; вызывается в потоке GUI"""
+        model = self.model
+        positions = array.array('d')
+        for x, y in model.positions():
+            positions.append(x)
+            positions.append(y)
+        return {
+            'generation': generation,
             'grid_size': self.grid_size,
             'image_path': self.image_path,
-            'pieces': [
-                {
-                    'id': piece.piece_id,
-                    'pos': (piece.pos().x(), piece.pos().y()),
-                    'is_placed': piece.is_placed,
-                    'connected_pieces': [p.piece_id for p in piece.connected_pieces]
-                }
-                for piece in self.pieces
-            ]
+            'positions': positions,
+            'groups': array.array('i', model.group_ids()),
+            'placed': [bool(is_placed) for is_placed in model.placed]
         }
-        
-        with open('puzzle_state.json', 'w') as f:
-            json.dump(state, f)
 
-    def load_saved_state(self):
-        try:
-            with open('puzzle_state.json', 'r') as f:
-                state = json.load(f)
-                
-            # Проверяем, соответствует ли сохранение текущей игре
-            if state['grid_size'] != self.grid_size or \
-               state['image_path'] != self.image_path:
-                return False
-                
-            # Создаем фрагменты и восстанавливаем их состояние
-            piece_width = self.scaled_image.width() // self.grid_size
-            piece_height = self.scaled_image.height() // self.grid_size
-
-            # Создаем словарь для хранения состояний фрагментов
-            piece_states = {ps['id']: ps for ps in state['pieces']}
-            
-            # Создаем все фрагменты в правильном порядке
-            for piece_id in range(len(state['pieces'])):
-                row = piece_id // self.grid_size
-                col = piece_id % self.grid_size
-                
-                # Вырезаем фрагмент изображения
-                piece_rect = QRect(
-                    col * piece_width,
-                    row * piece_height,
-                    piece_width,
-                    piece_height
-                )
-                piece_pixmap = self.scaled_image.copy(piece_rect)
-                
-                # Правильная позиция на игровом поле
-                correct_pos = QPointF(
-                    col * piece_width,
-                    row * piece_height
-                )
-                
-                # Создаем фрагмент
-                piece = PuzzlePiece(
-                    piece_pixmap,
-                    correct_pos,
-                    piece_id,
-                    self
-                )
-                
-                # Устанавливаем позицию и состояние из сохранения
-                piece_state = piece_states[piece_id]
-                piece.setPos(QPointF(piece_state['pos'][0], piece_state['pos'][1]))
-                piece.is_placed = piece_state['is_placed']
-                
-                # Добавляем фрагмент на сцену и в список
-                self.scene.addItem(piece)
-                self.pieces.append(piece)
-            
-            # После создания всех фрагментов восстанавливаем связи между ними
-            for piece_id, piece_state in piece_states.items():
-                piece = self.pieces[piece_id]
-                piece.connected_pieces = {
-                    self.pieces[pid] for pid in piece_state['connected_pieces']
-                }
-                
-            return True
-            
-        except (FileNotFoundError, json.JSONDecodeError, KeyError):
-            return False
+    def journal_records(self, piece_ids):
+        """Записи журнала для измененных фрагментов"""
+        model = self.model
+        return [
+            (piece_id, *model.position(piece_id), model.find(piece_id), bool(model.placed[piece_id]))
+            for piece_id in piece_ids
+        ]
+
+    def snapshot_progress(self):
+        """Краткая сводка прогресса для puzzle_progress.json"""
+        folder, filename = os.path.split(self.image_path)
+        return {
+            'theme': THEME_NAMES.get(os.path.basename(folder), os.path.basename(folder)),
+            'image': f"Изображение {os.path.splitext(filename)[0]}",
+            'puzzle_size': self.grid_size,
+            'placed_pieces': self.model.placed_count
+        }
+
+    def save_state(self):
+        """Немедленное сохранение игры (при выходе и завершении пазла)"""
+        self.autosave.save_now()
 
     def play_snap_sound(self):
-        if self.snap_player.source().isValid():
-            self.snap_player.setPosition(0)
-            self.snap_player.play()
+        if self.settings['sound']:
+            sound_effects.play('snap')
             
     def update_timer(self):
         """Update the timer display"""
@@ -902,11 +1863,17 @@ class GameWindow(QWidget):
             self.timer_label.setText(f"Время: {minutes:02d}:{seconds:02d}")
 
     def handle_back(self):
-        """Автоматически сохраняем прогресс перед возвратом"""
-        if not self.is_completed:
-            self.save_state()
+        """Возврат назад; прогресс сохраняется в closeEvent"""
         self.close()
 
+    def closeEvent(self, event):
+        """Автоматически сохраняем прогресс при любом способе закрытия окна"""
+        if not self.is_completed and self.pieces_ready:
+            self.save_state()
+        else:
+            self.autosave.cancel()
+        super().closeEvent(event)
+
     def confirm_reset(self):
         """Показываем диалог подтверждения сброса прогресса"""
         dialog = QMessageBox(self)
@@ -951,13 +1918,13 @@ class GameWindow(QWidget):
         self.timer_label.setText("Время: 00:00")
         
         # Удаляем сохраненное состояние
-        if os.path.exists('puzzle_state.json'):
-            os.remove('puzzle_state.json')
+        self.autosave.cancel()
+        for path in (SAVE_FILE, JOURNAL_FILE, STATE_FILE):
+            if os.path.exists(path):
+                os.remove(path)
         
         # Удаляем все фрагменты
-        for piece in self.pieces:
-            self.scene.removeItem(piece)
-        self.pieces.clear()
+        self.clear_pieces()
         
         # Сбрасываем флаг завершения
         self.is_completed = False
@@ -1062,6 +2029,31 @@ class DifficultyWindow(QWidget):
             btn.clicked.connect(lambda checked, s=size: self.start_game(s))
             difficulties_layout.addWidget(btn)
 
+        # Свой размер сетки
+        self.custom_size = QSpinBox()
+        self.custom_size.setRange(MIN_GRID_SIZE, MAX_GRID_SIZE)
+        self.custom_size.setValue(10)
+        self.custom_size.setSuffix(f' x {self.custom_size.value()}')
+        self.custom_size.valueChanged.connect(lambda value: self.custom_size.setSuffix(f' x {value}'))
+        self.custom_size.setStyleSheet("""
+            QSpinBox {
+                background-color: #FFE4E1;
+                color: #2F4F4F;
+                font-family: 'Georgia';
+                font-size: 26px;
+                border: 4px solid black;
+                border-radius: 20px;
+                padding: 15px 10px;
+                min-width: 140px;
+            }
+        """)
+        difficulties_layout.addWidget(self.custom_size)
+
+        custom_btn = QPushButton('Свой')
+        custom_btn.setStyleSheet(button_style)
+        custom_btn.clicked.connect(lambda: self.start_game(self.custom_size.value()))
+        difficulties_layout.addWidget(custom_btn)
+
         # Добавляем растяжку справа
         difficulties_layout.addStretch()
 
@@ -1074,11 +2066,179 @@ class DifficultyWindow(QWidget):
         self.game_window.show()
         self.close()
 
+class ThumbnailCache:
+    """Дисковый кэш миниатюр для окон выбора изображения"""
+    def __init__(self, folder=os.path.join('.cache', 'thumbnails'), size=QSize(190, 140)):
+        self.folder = folder
+        self.size = size
+
+    def cache_path(self, image_path):
+        # Ключ меняется вместе с путем, временем изменения и размером файла
+        stat = os.stat(image_path)
+        key = f"{os.path.abspath(image_path)}|{stat.st_mtime_ns}|{stat.st_size}|" \
+              f"{self.size.width()}x{self.size.height()}"
+        return os.path.join(self.folder, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.png')
+
+    def load(self, image_path):
+        """Готовая миниатюра из кэша или None"""
+        try:
+            path = self.cache_path(image_path)
+        except OSError:
+            return None
+        if not os.path.exists(path):
+            return None
+        image = QImage(path)
+        return None if image.isNull() else image
+
+    def generate(self, image_path):
+        """Декодирует изображение сразу в уменьшенном размере и сохраняет в кэш"""
+        image = load_scaled_image(image_path, self.size)
+        if image.isNull():
+            return image
+
+        os.makedirs(self.folder, exist_ok=True)
+        path = self.cache_path(image_path)
+        # Свое временное имя у каждой задачи: два окна темы могут
+        # одновременно создавать миниатюру одного изображения
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.folder)
+        os.close(fd)
+        try:
+            if image.save(tmp_path, 'PNG'):
+                os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return image
+
+class ThumbnailSignals(QObject):
+    loaded = pyqtSignal(str, QImage)
+
+class ThumbnailLoader(QRunnable):
+    """Фоновая задача: создание недостающей миниатюры"""
+    def __init__(self, cache, image_path):
+        super().__init__()
+        self.cache = cache
+        self.image_path = image_path
+        self.signals = ThumbnailSignals()
+
+    def run(self):
+        # Ошибка из фонового потока завершила бы все приложение:
+        # без миниатюры кнопка просто остается пустой
+        try:
+            image = self.cache.generate(self.image_path)
+        except OSError as error:
+            logger.warning('thumbnail is not created: %s', error)
+            return
+        if not image.isNull():
+            self.signals.loaded.emit(self.image_path, image)
+
+# Общий кэш миниатюр
+thumbnail_cache = ThumbnailCache()
+
+class BoardImageCache:
+    """Дисковый кэш уменьшенных изображений досок.
+
+    Пиксели хранятся без сжатия и при открытии отображаются в память,
+    поэтому повторный запуск недавнего пазла не декодирует изображение.
+    Записи сверх limit байт удаляются, начиная с давно не открывавшихся.
+    """
+    def __init__(self, folder=os.path.join('.cache', 'boards'), limit=BOARD_CACHE_LIMIT):
+        self.folder = folder
+        self.limit = limit
+
+    def cache_path(self, image_path, size):
+        # Ключ меняется вместе с путем, временем изменения и размером файла
+        # и размером доски; от сетки изображение не зависит
+        stat = os.stat(image_path)
+        key = f"{os.path.abspath(image_path)}|{stat.st_mtime_ns}|{stat.st_size}|" \
+              f"{size.width()}x{size.height()}"
+        return os.path.join(self.folder, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.rgb')
+
+    def load(self, image_path, size):
+        """Изображение из кэша или None.
+
+        Пиксели QImage остаются в отображенном файле, поэтому QImage нужно
+        хранить, пока живут сделанные из него QPixmap.
+        """
+        try:
+            path = self.cache_path(image_path, size)
+            with open(path, 'rb') as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if len(mapping) < BOARD_CACHE_HEADER.size:
+            return None
+        magic, width, height, bytes_per_line, image_format = BOARD_CACHE_HEADER.unpack_from(mapping)
+        if magic != BOARD_CACHE_MAGIC or \
+                len(mapping) < BOARD_CACHE_HEADER.size + height * bytes_per_line:
+            return None
+        # Отмечаем использование: по времени изменения выбираются записи для удаления
+        os.utime(path)
+        pixels = memoryview(mapping)[BOARD_CACHE_HEADER.size:]
+        return QImage(pixels, width, height, bytes_per_line, QImage.Format(image_format))
+
+    def store(self, image_path, size, image):
+        """Сохраняет изображение в кэш и удаляет лишние записи"""
+        if image.hasAlphaChannel():
+            image = image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+        else:
+            image = image.convertToFormat(QImage.Format.Format_RGB32)
+        bits = image.constBits()
+        bits.setsize(image.sizeInBytes())
+
+        os.makedirs(self.folder, exist_ok=True)
+        path = self.cache_path(image_path, size)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(BOARD_CACHE_HEADER.pack(
+                BOARD_CACHE_MAGIC, image.width(), image.height(), image.bytesPerLine(),
+                image.format().value
+            ))
+            f.write(bits.asstring())
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Удаляет давно не открывавшиеся записи, пока кэш больше limit"""
+        entries = []
+        with os.scandir(self.folder) as scan:
+            for entry in scan:
+                if entry.name.endswith('.rgb'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.limit:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def scaled_image(self, image_path, size):
+        """Уменьшенное изображение доски: из кэша, а при промахе - декодированием"""
+        image = self.load(image_path, size)
+        if image is not None:
+            return image
+        image = load_scaled_image(image_path, size)
+        if not image.isNull():
+            try:
+                self.store(image_path, size, image)
+            except OSError as error:
+                logger.warning('board cache is not written: %s', error)
+        return image
+
+# Общий кэш изображений досок
+board_cache = BoardImageCache()
+
 class BaseThemeWindow(QWidget):
     def __init__(self, title, folder_name):
         super().__init__()
         self.title = title
         self.folder_name = folder_name
+        # Кнопки, ожидающие миниатюру из фонового потока
+        self.image_buttons = {}
         self.initUI()
 
     def initUI(self):
@@ -1162,14 +2322,16 @@ class BaseThemeWindow(QWidget):
 
             if i < len(image_files):
                 img_path = os.path.join(self.folder_name, image_files[i])
-                pixmap = QPixmap(img_path)
-                scaled_pixmap = pixmap.scaled(
-                    190, 140,
-                    Qt.AspectRatioMode.KeepAspectRatio,
-                    Qt.TransformationMode.SmoothTransformation
-                )
-                btn.setIcon(QIcon(scaled_pixmap))
-                btn.setIconSize(QSize(190, 140))
+                btn.setIconSize(thumbnail_cache.size)
+                # Миниатюру берем из кэша, а недостающие создаем в фоне
+                thumbnail = thumbnail_cache.load(img_path)
+                if thumbnail is not None:
+                    btn.setIcon(QIcon(QPixmap.fromImage(thumbnail)))
+                else:
+                    self.image_buttons[img_path] = btn
+                    loader = ThumbnailLoader(thumbnail_cache, img_path)
+                    loader.signals.loaded.connect(self.set_thumbnail)
+                    QThreadPool.globalInstance().start(loader)
                 # Сохраняем путь к изображению и привязываем обработчик
                 btn.clicked.connect(lambda checked, path=img_path: self.show_difficulty_window(path))
             else:
@@ -1190,6 +2352,12 @@ class BaseThemeWindow(QWidget):
         main_layout.addLayout(grid_layout)
         main_layout.addStretch()
 
+    def set_thumbnail(self, image_path, image):
+        """Показываем миниатюру, созданную фоновым потоком"""
+        btn = self.image_buttons.pop(image_path, None)
+        if btn is not None:
+            btn.setIcon(QIcon(QPixmap.fromImage(image)))
+
     def show_difficulty_window(self, image_path):
         self.difficulty_window = DifficultyWindow(image_path)
         self.difficulty_window.show()
@@ -1210,8 +2378,8 @@ class MainWindow(QWidget):
     def __init__(self):
         super().__init__()
         self.initUI()
-        # Запускаем музыку при старте приложения
-        music_player.play()
+        # Запускаем музыку при старте приложения, не задерживая появление окна
+        music_player.start_later()
 
     def initUI(self):
         # Создаем верхний layout для кнопок
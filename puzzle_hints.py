@@ -0,0 +1,234 @@
+"""Подсказки по содержимому изображения: насколько края фрагментов подходят друг к другу.
+
+Для всех пар фрагментов считается несходство граничных полос пикселей
+(справа-налево и снизу-вверх). Матрицы строятся векторно с NumPy и
+кэшируются по изображению и размеру сетки; по ним движок предлагает
+следующий ход и собирает выбранную группу. Модуль не зависит от Qt:
+пиксели передаются готовым массивом.
+"""
+import heapq
+from collections import OrderedDict
+
+import numpy as np
+
+# Сколько матриц (изображение + сетка) держать в памяти
+EDGE_CACHE_SIZE = 4
+
+# Матрицы занимают n x n чисел: для 50x50 это 2 x 25 МБ, дальше подсказки выключены
+EDGE_MATRIX_MAX_PIECES = 2500
+
+# Сколько неудачных фрагментов пробовать у одного края группы при сборке
+ASSEMBLE_TRIES_PER_SIDE = 3
+
+# Направления: (сдвиг по столбцам, сдвиг по строкам)
+RIGHT, DOWN, LEFT, UP = (1, 0), (0, 1), (-1, 0), (0, -1)
+DIRECTIONS = (RIGHT, DOWN, LEFT, UP)
+
+
+def pixels_from_buffer(buffer, width, height, bytes_per_line):
+    """Массив (height, width, 3) из 32-битного буфера изображения (например, QImage.Format_RGB32)"""
+    rows = np.frombuffer(buffer, dtype=np.uint8, count=height * bytes_per_line)
+    return rows.reshape(height, bytes_per_line // 4, 4)[:, :width, :3].copy()
+
+
+def squared_distances(first, second):
+    """Квадраты расстояний между каждой строкой first и каждой строкой second"""
+    return (first * first).sum(axis=1)[:, None] + (second * second).sum(axis=1)[None, :] - 2 * (first @ second.T)
+
+
+def edge_dissimilarity(edge, inner, other_edge, other_inner):
+    """Несходство краев edge[i] и other_edge[j], если фрагменты стоят вплотную.
+
+    Каждый край продолжается градиентом (2 * край - соседняя полоса) на место
+    другого; сравниваются продолжения в обе стороны.
+    """
+    dissimilarity = squared_distances(2 * edge - inner, other_edge) + \
+        squared_distances(2 * other_edge - other_inner, edge).T
+    # Ошибки округления не должны давать отрицательных значений
+    np.maximum(dissimilarity, 0, out=dissimilarity)
+    np.fill_diagonal(dissimilarity, np.inf)
+    return dissimilarity
+
+
+class EdgeMatrix:
+    """Несходство краев всех пар фрагментов.
+
+    right[i, j] - насколько плохо фрагмент j стоит справа от i,
+    down[i, j] - насколько плохо j стоит под i.
+    """
+    def __init__(self, pixels, grid_size):
+        height = pixels.shape[0] // grid_size
+        width = pixels.shape[1] // grid_size
+        count = grid_size * grid_size
+        # (строка, столбец, y, x, канал) - без копирования изображения
+        tiles = pixels[:grid_size * height, :grid_size * width].reshape(
+            grid_size, height, grid_size, width, -1
+        ).transpose(0, 2, 1, 3, 4)
+
+        def strip(pixels):
+            return pixels.reshape(count, -1).astype(np.float32)
+
+        self.right = edge_dissimilarity(
+            strip(tiles[:, :, :, -1]), strip(tiles[:, :, :, -2]),
+            strip(tiles[:, :, :, 0]), strip(tiles[:, :, :, 1])
+        )
+        self.down = edge_dissimilarity(
+            strip(tiles[:, :, -1]), strip(tiles[:, :, -2]),
+            strip(tiles[:, :, 0]), strip(tiles[:, :, 1])
+        )
+
+    def costs(self, piece_id, direction):
+        """Несходство каждого фрагмента, поставленного от piece_id в направлении direction"""
+        if direction == RIGHT:
+            return self.right[piece_id]
+        if direction == LEFT:
+            return self.right[:, piece_id]
+        if direction == DOWN:
+            return self.down[piece_id]
+        return self.down[:, piece_id]
+
+
+_edge_cache = OrderedDict()
+
+
+def edge_matrix(image_key, grid_size, load_pixels):
+    """EdgeMatrix изображения из кэша; load_pixels() вызывается только при промахе"""
+    key = (image_key, grid_size)
+    matrix = _edge_cache.get(key)
+    if matrix is None:
+        matrix = _edge_cache[key] = EdgeMatrix(load_pixels(), grid_size)
+        if len(_edge_cache) > EDGE_CACHE_SIZE:
+            _edge_cache.popitem(last=False)
+    else:
+        _edge_cache.move_to_end(key)
+    return matrix
+
+
+def neighbor_in(model, piece_id, direction):
+    """Фрагмент, стоящий от piece_id в направлении direction в собранном пазле; None у края"""
+    row, col = divmod(piece_id, model.grid_size)
+    row, col = row + direction[1], col + direction[0]
+    if 0 <= row < model.grid_size and 0 <= col < model.grid_size:
+        return row * model.grid_size + col
+    return None
+
+
+def free_sides(model, groups):
+    """Для каждого направления - у каких фрагментов этот край не занят своей же группой"""
+    ids = np.arange(model.count)
+    rows, cols = np.divmod(ids, model.grid_size)
+    free = {}
+    for dx, dy in DIRECTIONS:
+        inside = (0 <= cols + dx) & (cols + dx < model.grid_size) & \
+            (0 <= rows + dy) & (rows + dy < model.grid_size)
+        neighbors = np.where(inside, ids + dy * model.grid_size + dx, ids)
+        free[dx, dy] = ~inside | (groups[neighbors] != groups)
+    return free
+
+
+def target_position(model, piece_id, other_id, direction):
+    """Куда поставить piece_id, чтобы он оказался от other_id в направлении direction"""
+    x, y = model.position(other_id)
+    return x + direction[0] * model.piece_width, y + direction[1] * model.piece_height
+
+
+def suggest_move(model, matrix):
+    """Лучший следующий ход: (piece_id, other_id, direction).
+
+    Группу piece_id нужно поставить от other_id в направлении direction;
+    двигается меньшая из двух групп и никогда - размещенная.
+    None, если ходов нет.
+    """
+    groups = np.array(model.group_ids())
+    placed = np.asarray(model.placed, dtype=bool)
+    sizes = np.bincount(groups, minlength=model.count)[groups]
+    free = free_sides(model, groups)
+    allowed = (groups[:, None] != groups[None, :]) & ~(placed[:, None] & placed[None, :])
+    best = None
+    for direction, opposite, costs in ((RIGHT, LEFT, matrix.right), (DOWN, UP, matrix.down)):
+        # costs[i, j]: j стоит от i в направлении direction
+        masked = np.where(allowed & free[direction][:, None] & free[opposite][None, :], costs, np.inf)
+        first, second = np.unravel_index(int(masked.argmin()), masked.shape)
+        cost = masked[first, second]
+        if np.isfinite(cost) and (best is None or cost < best[0]):
+            best = (cost, int(first), int(second), direction, opposite)
+    if best is None:
+        return None
+
+    _, first, second, direction, opposite = best
+    if placed[second] or (sizes[second] > sizes[first] and not placed[first]):
+        return first, second, opposite
+    return second, first, direction
+
+
+def try_move(model, piece_id, other_id, direction):
+    """Ставит группу piece_id от other_id в направлении direction.
+
+    Если фрагменты не соединились, группа возвращается на место.
+    Возвращает True при соединении.
+    """
+    start = model.position(piece_id)
+    model.move_group_to(piece_id, *target_position(model, piece_id, other_id, direction))
+    if model.check_nearby_pieces(piece_id):
+        # Как при отпускании: размещенная группа соединяется со всеми соседями
+        model.drop(piece_id)
+        return True
+    model.move_group_to(piece_id, *start)
+    return False
+
+
+def assemble_group(model, matrix, piece_id):
+    """Собирает группу piece_id: жадно приставляет к ее свободным краям
+    лучше всего подходящие фрагменты из неразмещенных групп.
+
+    Неудачные попытки откатываются; у каждого края пробуется
+    не больше ASSEMBLE_TRIES_PER_SIDE фрагментов.
+    Возвращает id присоединенных фрагментов.
+    """
+    groups = np.array(model.group_ids())
+    movable = ~np.asarray(model.placed, dtype=bool)
+    free = free_sides(model, groups)
+    in_group = groups == groups[piece_id]
+    rejected = {}
+    queue = []
+
+    def occupied(member, direction):
+        neighbor = neighbor_in(model, member, direction)
+        return neighbor is not None and in_group[neighbor]
+
+    def push(member, direction):
+        """Лучший кандидат для края в очередь с приоритетом"""
+        tried = rejected.get((member, direction), ())
+        if len(tried) >= ASSEMBLE_TRIES_PER_SIDE:
+            return
+        opposite = (-direction[0], -direction[1])
+        costs = np.where(free[opposite] & movable & ~in_group, matrix.costs(member, direction), np.inf)
+        costs[list(tried)] = np.inf
+        candidate = int(costs.argmin())
+        if np.isfinite(costs[candidate]):
+            heapq.heappush(queue, (float(costs[candidate]), member, direction, candidate))
+
+    def add_members(members):
+        in_group[members] = True
+        for member in members:
+            for direction in DIRECTIONS:
+                if not occupied(member, direction):
+                    push(member, direction)
+
+    add_members(np.flatnonzero(in_group).tolist())
+    attached = []
+    while queue:
+        _, member, direction, candidate = heapq.heappop(queue)
+        if occupied(member, direction):
+            continue
+        if in_group[candidate]:
+            # Кандидат уже присоединился через другой край
+            push(member, direction)
+        elif try_move(model, candidate, member, direction):
+            members = [other for other in model.group_members(piece_id) if not in_group[other]]
+            attached.extend(members)
+            add_members(members)
+        else:
+            rejected.setdefault((member, direction), set()).add(candidate)
+            push(member, direction)
+    return attached
@@ -0,0 +1,541 @@
+"""Модель пазла без Qt: позиции, группы и правила притягивания фрагментов.
+
+Qt-элементы в puzzle.py только отображают состояние модели, поэтому
+притягивание и объединение групп можно проверять и замерять в обычном
+процессе, без сцены и QApplication.
+"""
+
+import math
+from collections import deque
+
+# Расстояние (в пикселях), на котором фрагменты притягиваются друг к другу
+SNAP_DISTANCE = 30
+
+# Отступ области раздачи от собранного пазла
+SCATTER_MARGIN = 50
+
+
+# NumPy импортируется только для модели на массивах, см. load_numpy()
+np = None
+
+
+def load_numpy():
+    """Модуль NumPy, загружаемый при первом обращении; None, если он не установлен"""
+    global np
+    if np is None:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            np = False
+    return np or None
+
+
+def scatter_gap(piece_width, piece_height):
+    """Зазор между соседними местами раздачи"""
+    return max(2, round(min(piece_width, piece_height) * 0.15))
+
+
+def scatter_area(count, piece_width, piece_height, board_width):
+    """Область раздачи справа от пазла: (left, top, right, bottom).
+
+    Зависит только от числа и размера фрагментов, поэтому для сохраненной
+    игры получается та же область, что и при раздаче.
+    """
+    gap = scatter_gap(piece_width, piece_height)
+    slot_width, slot_height = piece_width + gap, piece_height + gap
+    # Примерно квадратная область
+    columns = max(1, math.ceil(math.sqrt(count * slot_height / slot_width)))
+    rows = math.ceil(count / columns)
+    left = board_width + SCATTER_MARGIN
+    return left, 0, left + columns * slot_width, rows * slot_height
+
+
+def shelf_slots(count, piece_width, piece_height, area):
+    """Места на полках: слева направо, пока полка не заполнится, затем следующая полка"""
+    gap = scatter_gap(piece_width, piece_height)
+    left, top, right, bottom = area
+    slots = []
+    x, y = left, top
+    for _ in range(count):
+        if x + piece_width + gap > right and x > left:
+            x, y = left, y + piece_height + gap
+        slots.append((x, y))
+        x += piece_width + gap
+    return slots
+
+
+def shelf_layout(count, piece_width, piece_height, area, rng):
+    """Фрагменты без перекрытий ровными рядами в случайном порядке"""
+    slots = shelf_slots(count, piece_width, piece_height, area)
+    rng.shuffle(slots)
+    return slots
+
+
+def jitter_layout(count, piece_width, piece_height, area, rng):
+    """Как shelf_layout, но каждый фрагмент немного сдвинут внутри своего места"""
+    gap = scatter_gap(piece_width, piece_height)
+    return [
+        (x + rng.uniform(0, gap), y + rng.uniform(0, gap))
+        for x, y in shelf_layout(count, piece_width, piece_height, area, rng)
+    ]
+
+
+# Раскладки для новой игры: функция (count, piece_width, piece_height, area, rng) -> позиции.
+# Все они размещают фрагменты без перекрытий внутри scatter_area за линейное время
+SCATTER_LAYOUTS = {
+    'shelf': shelf_layout,
+    'jitter': jitter_layout
+}
+
+
+class PuzzleListener:
+    """Получатель изменений модели; представление переопределяет нужные методы"""
+    def group_moved(self, root):
+        pass
+
+    def groups_merged(self, root, absorbed_root, absorbed_ids):
+        pass
+
+
+class PuzzleModel:
+    """Состояние доски: позиции, правильные позиции, группы и размещенные фрагменты.
+
+    Фрагменты нумеруются построчно: id = row * grid_size + col.
+    Группы хранятся в системе непересекающихся множеств (union-find).
+    Позиция фрагмента складывается из начала координат его группы
+    и смещения внутри группы, поэтому группа любого размера сдвигается за O(1).
+    """
+    def __init__(self, grid_size, piece_width, piece_height, snap_distance=SNAP_DISTANCE):
+        self.grid_size = grid_size
+        self.piece_width = piece_width
+        self.piece_height = piece_height
+        self.snap_distance = snap_distance
+        self.count = grid_size * grid_size
+
+        # Правильные позиции фрагментов в собранном пазле
+        self.correct = [
+            ((piece_id % grid_size) * piece_width, (piece_id // grid_size) * piece_height)
+            for piece_id in range(self.count)
+        ]
+        # Таблица соседей: для каждого фрагмента до 4 записей (id соседа, dx, dy),
+        # где (dx, dy) - где сосед должен стоять относительно фрагмента
+        self.neighbors = self.neighbor_table()
+        self.members = [[piece_id] for piece_id in range(self.count)]
+        self.placed_count = 0
+        self.init_state()
+
+        # Область, за которую нельзя вытащить фрагменты: (left, top, right, bottom)
+        self.bounds = None
+        self.listener = PuzzleListener()
+
+    def init_state(self):
+        """Начальные позиции, группы и флаги размещения: все фрагменты на своих местах, по одному"""
+        # Union-find; members, origin и group_bounds имеют смысл только для корней
+        self.parent = list(range(self.count))
+        self.origin = [list(pos) for pos in self.correct]
+        self.local = [[0.0, 0.0] for _ in range(self.count)]
+        # Границы группы относительно ее начала координат: (left, top, right, bottom)
+        self.group_bounds = [(0.0, 0.0, self.piece_width, self.piece_height)] * self.count
+        self.placed = [False] * self.count
+
+    def neighbor_table(self):
+        grid_size, width, height = self.grid_size, self.piece_width, self.piece_height
+        table = []
+        for piece_id in range(self.count):
+            row, col = divmod(piece_id, grid_size)
+            entries = []
+            if row > 0:
+                entries.append((piece_id - grid_size, 0, -height))
+            if col > 0:
+                entries.append((piece_id - 1, -width, 0))
+            if col < grid_size - 1:
+                entries.append((piece_id + 1, width, 0))
+            if row < grid_size - 1:
+                entries.append((piece_id + grid_size, 0, height))
+            table.append(tuple(entries))
+        return table
+
+    # --- Группы ---
+
+    def find(self, piece_id):
+        """Корень группы со сжатием пути"""
+        parent = self.parent
+        root = piece_id
+        while parent[root] != root:
+            root = parent[root]
+        while parent[piece_id] != root:
+            parent[piece_id], piece_id = root, parent[piece_id]
+        return root
+
+    def group_members(self, piece_id):
+        """Все фрагменты группы, включая сам фрагмент"""
+        return self.members[self.find(piece_id)]
+
+    def same_group(self, piece_id, other_id):
+        return self.find(piece_id) == self.find(other_id)
+
+    def merge(self, piece_id, other_id):
+        """Объединение групп: меньшая подвешивается к большей"""
+        root, other_root = self.find(piece_id), self.find(other_id)
+        if root == other_root:
+            return root
+        if len(self.members[root]) < len(self.members[other_root]):
+            root, other_root = other_root, root
+
+        # Пересчитываем смещения поглощаемых фрагментов к началу координат новой группы
+        ox, oy = self.origin[root]
+        dx = self.origin[other_root][0] - ox
+        dy = self.origin[other_root][1] - oy
+        absorbed = self.members[other_root]
+        for member in absorbed:
+            offset = self.local[member]
+            offset[0] += dx
+            offset[1] += dy
+
+        left, top, right, bottom = self.group_bounds[root]
+        other_left, other_top, other_right, other_bottom = self.group_bounds[other_root]
+        self.group_bounds[root] = (
+            min(left, other_left + dx), min(top, other_top + dy),
+            max(right, other_right + dx), max(bottom, other_bottom + dy)
+        )
+
+        self.parent[other_root] = root
+        self.members[root].extend(absorbed)
+        self.members[other_root] = []
+        self.listener.groups_merged(root, other_root, absorbed)
+        return root
+
+    # --- Позиции ---
+
+    def position(self, piece_id):
+        root = self.find(piece_id)
+        origin, offset = self.origin[root], self.local[piece_id]
+        return origin[0] + offset[0], origin[1] + offset[1]
+
+    def positions(self):
+        return [self.position(piece_id) for piece_id in range(self.count)]
+
+    def group_offset(self, piece_id):
+        """Смещение фрагмента относительно корня его группы"""
+        x, y = self.local[piece_id]
+        return x, y
+
+    def group_rect(self, piece_id):
+        """Границы всей группы на доске"""
+        root = self.find(piece_id)
+        ox, oy = self.origin[root]
+        left, top, right, bottom = self.group_bounds[root]
+        return left + ox, top + oy, right + ox, bottom + oy
+
+    def move_group(self, piece_id, dx, dy):
+        """Сдвигает всю группу фрагмента"""
+        root = self.find(piece_id)
+        origin = self.origin[root]
+        origin[0] += dx
+        origin[1] += dy
+        self.listener.group_moved(root)
+
+    def move_group_to(self, piece_id, x, y):
+        """Сдвигает группу так, чтобы фрагмент оказался в точке (x, y)"""
+        px, py = self.position(piece_id)
+        self.move_group(piece_id, x - px, y - py)
+
+    def clamp_delta(self, piece_id, dx, dy):
+        """Ограничивает сдвиг группы пределами доски"""
+        if self.bounds is None:
+            return dx, dy
+        left, top, right, bottom = self.group_rect(piece_id)
+        min_x, min_y, max_x, max_y = self.bounds
+        dx = max(min_x - left, min(dx, max_x - right))
+        dy = max(min_y - top, min(dy, max_y - bottom))
+        return dx, dy
+
+    # --- Размещение ---
+
+    def set_placed(self, piece_id, value):
+        # Размещенный фрагмент всегда стоит на своей правильной позиции,
+        # поэтому модель ведет счетчик без пересчета расстояний
+        if value != self.placed[piece_id]:
+            self.placed[piece_id] = value
+            self.placed_count += 1 if value else -1
+
+    def set_group_placed(self, piece_ids):
+        for piece_id in piece_ids:
+            self.set_placed(piece_id, True)
+
+    def is_complete(self):
+        return self.placed_count == self.count
+
+    def pieces_near_target(self, distance=None):
+        """Фрагменты, стоящие ближе distance (по умолчанию - расстояния притягивания) к своим местам"""
+        if distance is None:
+            distance = self.snap_distance
+        return [
+            piece_id for piece_id, ((x, y), (correct_x, correct_y)) in enumerate(zip(self.positions(), self.correct))
+            if abs(x - correct_x) + abs(y - correct_y) < distance
+        ]
+
+    # --- Соседи и притягивание ---
+
+    def neighbor_ids(self, piece_id):
+        """Идентификаторы (не более 4) соседей фрагмента в собранном пазле"""
+        return [other_id for other_id, _, _ in self.neighbors[piece_id]]
+
+    def are_neighbors(self, piece_id, other_id):
+        """Проверка, должны ли фрагменты быть соседями в собранном пазле"""
+        return other_id in self.neighbor_ids(piece_id)
+
+    def offset_error(self, piece_id, other_id, dx, dy):
+        """Насколько сосед отстоит от места, где он должен быть относительно фрагмента"""
+        x, y = self.position(piece_id)
+        other_x, other_y = self.position(other_id)
+        return abs(other_x - x - dx) + abs(other_y - y - dy)
+
+    def target_next_to(self, piece_id, other_id):
+        """Позиция фрагмента рядом с соседом в соответствии с собранным пазлом"""
+        x, y = self.correct[piece_id]
+        other_x, other_y = self.correct[other_id]
+        px, py = self.position(other_id)
+        return px - (other_x - x), py - (other_y - y)
+
+    def nearby_neighbor(self, piece_id, placed_only=False):
+        """Сосед из другой группы, стоящий почти там, где должен; None, если такого нет"""
+        for other_id, dx, dy in self.neighbors[piece_id]:
+            if placed_only and not self.placed[other_id]:
+                continue
+            if self.offset_error(piece_id, other_id, dx, dy) < self.snap_distance and \
+                    not self.same_group(piece_id, other_id):
+                return other_id
+        return None
+
+    def drag_to(self, piece_id, x, y, check_snap=True):
+        """Шаг перетаскивания: группа сдвигается так, чтобы фрагмент оказался в (x, y).
+
+        Возвращает True, если при этом фрагмент притянулся к соседу.
+        При check_snap=False притягивание не проверяется.
+        """
+        px, py = self.position(piece_id)
+        dx, dy = self.clamp_delta(piece_id, x - px, y - py)
+        self.move_group(piece_id, dx, dy)
+        return check_snap and self.check_nearby_pieces(piece_id)
+
+    def drop(self, piece_id):
+        """Фрагмент отпущен: пробуем соединить"""
+        return self.check_connection(piece_id)
+
+    def check_nearby_pieces(self, piece_id):
+        """Проверка близости к соседям во время перетаскивания"""
+        if self.placed[piece_id]:
+            return False
+        other_id = self.nearby_neighbor(piece_id)
+        if other_id is None:
+            return False
+        self.snap_to_piece(piece_id, other_id)
+        return True
+
+    def snap_to_piece(self, piece_id, other_id):
+        """Прикрепление фрагмента (вместе с группой) к другому фрагменту"""
+        self.move_group_to(piece_id, *self.target_next_to(piece_id, other_id))
+        self.connect(piece_id, other_id)
+
+    def check_connection(self, piece_id):
+        """Проверка возможности соединения с другими фрагментами"""
+        # Проверяем, находится ли фрагмент близко к своей правильной позиции
+        x, y = self.position(piece_id)
+        correct_x, correct_y = self.correct[piece_id]
+        if abs(x - correct_x) + abs(y - correct_y) < self.snap_distance:
+            # Устанавливаем фрагмент (и всю его группу) точно на место
+            self.move_group_to(piece_id, correct_x, correct_y)
+            self.set_group_placed(self.group_members(piece_id))
+
+            # Проверяем и соединяем с соседними фрагментами
+            self.check_and_connect_neighbors(piece_id)
+            return True
+
+        # Если фрагмент не на своем месте, пробуем соединить с другими размещенными фрагментами
+        return self.try_connect_to_placed_neighbors(piece_id)
+
+    def try_connect_to_placed_neighbors(self, piece_id):
+        """Попытка соединения с уже размещенными соседними фрагментами"""
+        other_id = self.nearby_neighbor(piece_id, placed_only=True)
+        if other_id is None:
+            return False
+        self.snap_to_piece(piece_id, other_id)
+        return True
+
+    def check_and_connect_neighbors(self, piece_id):
+        """Проверка и соединение с соседними фрагментами.
+
+        Обход в ширину по таблице соседей: каждый присоединенный фрагмент
+        попадает в очередь один раз, поэтому даже большая область
+        размещенных фрагментов соединяется за линейное время и без рекурсии.
+        """
+        queue = deque([piece_id])
+        while queue:
+            current = queue.popleft()
+            for other_id, dx, dy in self.neighbors[current]:
+                if self.placed[other_id] and not self.same_group(current, other_id) and \
+                        self.offset_error(current, other_id, dx, dy) < self.snap_distance:
+                    self.connect(current, other_id)
+                    queue.append(other_id)
+
+    def connect(self, piece_id, other_id):
+        """Соединение фрагментов; группа считается размещенной, если хотя бы одна из частей уже на месте"""
+        if self.same_group(piece_id, other_id):
+            return
+        # Фрагменты одной группы размещены одинаково, поэтому достаточно
+        # обновить только те части, которые еще не были размещены
+        roots = (self.find(piece_id), self.find(other_id))
+        unplaced = [self.members[root] for root in roots if not self.placed[root]]
+        placed = len(unplaced) < len(roots)
+        unplaced = [list(members) for members in unplaced]
+        self.merge(piece_id, other_id)
+        if placed:
+            for members in unplaced:
+                self.set_group_placed(members)
+
+    # --- Сохранение ---
+
+    def group_ids(self):
+        """Номер группы каждого фрагмента - id корня"""
+        return [self.find(piece_id) for piece_id in range(self.count)]
+
+    def load_state(self, positions, groups, placed):
+        """Восстанавливает доску из сохранения за O(n)"""
+        for piece_id, (x, y) in enumerate(positions):
+            self.origin[piece_id] = [x, y]
+        leaders = {}
+        for piece_id, group in enumerate(groups):
+            leader = leaders.setdefault(group, piece_id)
+            self.merge(leader, piece_id)
+        for piece_id, is_placed in enumerate(placed):
+            # Старые сохранения могли пометить размещенной группу не на своем месте
+            x, y = self.position(piece_id)
+            correct_x, correct_y = self.correct[piece_id]
+            self.set_placed(piece_id, is_placed and abs(x - correct_x) + abs(y - correct_y) < 1)
+
+
+class ArrayPuzzleModel(PuzzleModel):
+    """Модель, хранящая состояние доски в массивах NumPy.
+
+    Позиции (абсолютные), правильные позиции, номера групп и флаги размещения
+    лежат в непрерывных массивах. Сдвиг группы и поиск фрагментов рядом
+    со своими местами - по одной векторной операции. Правила притягивания
+    те же, что у PuzzleModel, но отдельные шаги перетаскивания медленнее
+    из-за накладных расходов NumPy на каждый вызов.
+    """
+    def __init__(self, grid_size, piece_width, piece_height, snap_distance=SNAP_DISTANCE):
+        if load_numpy() is None:
+            raise ImportError('ArrayPuzzleModel requires NumPy')
+        super().__init__(grid_size, piece_width, piece_height, snap_distance)
+
+    def init_state(self):
+        # Начала координат групп и смещения здесь заменены абсолютными позициями
+        self.correct_xy = np.array(self.correct, dtype=np.float64)
+        self.xy = self.correct_xy.copy()
+        # Номер группы каждого фрагмента - id корня; поддерживается при объединении
+        self.group = np.arange(self.count)
+        self.placed = np.zeros(self.count, dtype=bool)
+        # Индексы фрагментов группы в виде массива, по корню
+        self.member_index = {}
+
+    def group_index(self, root):
+        index = self.member_index.get(root)
+        if index is None:
+            index = self.member_index[root] = np.array(self.members[root])
+        return index
+
+    # --- Группы ---
+
+    def find(self, piece_id):
+        return int(self.group[piece_id])
+
+    def merge(self, piece_id, other_id):
+        """Объединение групп: номера меньшей группы переписываются на корень большей"""
+        root, other_root = self.find(piece_id), self.find(other_id)
+        if root == other_root:
+            return root
+        if len(self.members[root]) < len(self.members[other_root]):
+            root, other_root = other_root, root
+
+        absorbed = self.members[other_root]
+        self.group[absorbed] = root
+        self.members[root].extend(absorbed)
+        self.members[other_root] = []
+        self.member_index.pop(root, None)
+        self.member_index.pop(other_root, None)
+        self.listener.groups_merged(root, other_root, absorbed)
+        return root
+
+    # --- Позиции ---
+
+    def position(self, piece_id):
+        x, y = self.xy[piece_id].tolist()
+        return x, y
+
+    def positions(self):
+        return self.xy.tolist()
+
+    def group_offset(self, piece_id):
+        x, y = self.xy[piece_id] - self.xy[self.find(piece_id)]
+        return float(x), float(y)
+
+    def group_rect(self, piece_id):
+        points = self.xy[self.group_index(self.find(piece_id))]
+        left, top = points.min(axis=0)
+        right, bottom = points.max(axis=0)
+        return float(left), float(top), float(right) + self.piece_width, float(bottom) + self.piece_height
+
+    def move_group(self, piece_id, dx, dy):
+        root = self.find(piece_id)
+        self.xy[self.group_index(root)] += (dx, dy)
+        self.listener.group_moved(root)
+
+    # --- Размещение ---
+
+    def set_group_placed(self, piece_ids):
+        index = np.asarray(piece_ids)
+        self.placed_count += len(index) - int(np.count_nonzero(self.placed[index]))
+        self.placed[index] = True
+
+    def pieces_near_target(self, distance=None):
+        if distance is None:
+            distance = self.snap_distance
+        error = np.abs(self.xy - self.correct_xy).sum(axis=1)
+        return np.flatnonzero(error < distance)
+
+    # --- Сохранение ---
+
+    def group_ids(self):
+        return self.group.tolist()
+
+    def load_state(self, positions, groups, placed):
+        self.xy[:] = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        # Корень группы - первый ее фрагмент
+        _, leaders, inverse = np.unique(np.asarray(groups), return_index=True, return_inverse=True)
+        self.group = leaders[inverse.reshape(-1)]
+        self.members = [[] for _ in range(self.count)]
+        for piece_id, root in enumerate(self.group.tolist()):
+            self.members[root].append(piece_id)
+        self.member_index.clear()
+        # Старые сохранения могли пометить размещенной группу не на своем месте
+        self.placed = np.asarray(placed, dtype=bool) & (np.abs(self.xy - self.correct_xy).sum(axis=1) < 1)
+        self.placed_count = int(np.count_nonzero(self.placed))
+
+
+# Реализации модели по имени настройки 'model_backend'
+PUZZLE_MODELS = {'lists': PuzzleModel, 'arrays': ArrayPuzzleModel}
+
+
+def model_class(name):
+    """Класс модели по настройке; без NumPy всегда используется PuzzleModel.
+
+    'auto' пока выбирает списки: модель на массивах медленнее на drag_to и drop,
+    из которых состоит игра.
+    """
+    if name == 'auto':
+        name = 'lists'
+    if name == 'arrays' and load_numpy() is None:
+        return PuzzleModel
+    return PUZZLE_MODELS.get(name, PuzzleModel)
@@ -0,0 +1,89 @@
+"""Тесты модели пазла: объединение размещенных областей одним отпусканием фрагмента.
+
+Запуск:
+    python -m pytest -q
+    python -m unittest test_puzzle_model
+"""
+import unittest
+from collections import Counter
+
+from puzzle_model import ArrayPuzzleModel, PuzzleModel, load_numpy
+
+PIECE_SIZE = 7
+GRID_SIZE = 100
+
+
+class CountingTable(list):
+    """Таблица соседей, считающая обращения к строкам: обход берет строку фрагмента при его посещении"""
+    def __init__(self, rows):
+        super().__init__(rows)
+        self.visits = Counter()
+
+    def __getitem__(self, piece_id):
+        self.visits[piece_id] += 1
+        return super().__getitem__(piece_id)
+
+
+def snake(grid_size):
+    """Змейка через всю доску: четные строки целиком, между ними - по одному фрагменту у края"""
+    piece_ids = []
+    for row in range(0, grid_size, 2):
+        columns = range(grid_size) if row // 2 % 2 == 0 else range(grid_size - 1, -1, -1)
+        piece_ids.extend(row * grid_size + col for col in columns)
+        if row + 1 < grid_size:
+            col = grid_size - 1 if row // 2 % 2 == 0 else 0
+            piece_ids.append((row + 1) * grid_size + col)
+    return piece_ids
+
+
+class RegionMergeTest(unittest.TestCase):
+    model_type = PuzzleModel
+
+    def make_model(self, placed_ids):
+        """Доска, где placed_ids размещены одиночными фрагментами, а остальные лежат в стороне"""
+        model = self.model_type(GRID_SIZE, PIECE_SIZE, PIECE_SIZE)
+        placed_ids = set(placed_ids)
+        offset = GRID_SIZE * PIECE_SIZE * 2
+        positions = [
+            (x, y) if piece_id in placed_ids else (x + offset, y + offset)
+            for piece_id, (x, y) in enumerate(model.correct)
+        ]
+        placed = [piece_id in placed_ids for piece_id in range(model.count)]
+        model.load_state(positions, list(range(model.count)), placed)
+        model.neighbors = CountingTable(model.neighbors)
+        return model
+
+    def test_whole_board_joins_in_one_drop(self):
+        model = self.make_model(range(GRID_SIZE * GRID_SIZE))
+        self.assertTrue(model.drop(model.count // 2))
+        self.assertEqual(len(model.group_members(0)), model.count)
+        self.assertEqual(sum(1 for members in model.members if members), 1)
+        self.assertTrue(model.is_complete())
+
+    def test_snake_region_joins_in_one_drop(self):
+        # Путь длиной в половину доски: рекурсивный обход упирался в предел глубины
+        path = snake(GRID_SIZE)
+        model = self.make_model(path)
+        self.assertTrue(model.drop(path[0]))
+        self.assertEqual(sorted(model.group_members(path[-1])), sorted(path))
+        self.assertEqual(model.placed_count, len(path))
+        # Фрагменты вне змейки остались одиночными
+        outside = set(range(model.count)) - set(path)
+        self.assertTrue(all(len(model.group_members(piece_id)) == 1 for piece_id in outside))
+
+    def test_each_piece_visited_once(self):
+        path = snake(GRID_SIZE)
+        model = self.make_model(path)
+        model.drop(path[len(path) // 2])
+        visits = model.neighbors.visits
+        self.assertEqual(set(visits), set(path))
+        self.assertEqual(max(visits.values()), 1)
+
+
+@unittest.skipIf(load_numpy() is None, 'NumPy is not installed')
+class ArrayRegionMergeTest(RegionMergeTest):
+    model_type = ArrayPuzzleModel
+
+
+if __name__ == '__main__':
+    unittest.main()